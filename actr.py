@@ -26,6 +26,7 @@ communication process.
 
 import json
 import threading
+import collections
 import socket
 import time
 import os
@@ -33,26 +34,39 @@ import sys
 import __main__
 import importlib
 
+class connection_lost(Exception):
+    """The connection to ACT-R closed or stopped answering; pending requests are abandoned."""
+
+class request_timeout(Exception):
+    """ACT-R did not answer a request before its deadline."""
+
 class request():
-    def __init__(self,id):
+    # lock is handed out already acquired; releasing it wakes the sender.
+    # Only the thread that pops the request from interface.actions releases
+    # it, so it is released exactly once and can be reused afterwards.
+    __slots__ = ("id","lock","complete","cancelled","success","results")
+
+    def __init__(self,id,lock):
         self.id = id
-        self.lock = threading.Lock()
-        self.cv = threading.Condition(self.lock)
+        self.lock = lock
         self.complete = False
+        self.cancelled = False
 
     def notify_result(self):
-        self.cv.acquire()
         self.complete = True
-        self.cv.notify()
-        self.cv.release()
+        self.lock.release()
+
+    def cancel(self):
+        self.cancelled = True
+        self.lock.release()
 
 
 locals = threading.local()
 
 class actr():
     
-    def __init__(self,host,port):
-        self.interface = interface(host, port)
+    def __init__(self,host,port,tap=None):
+        self.interface = interface(host, port, tap)
         if self.interface.connected :
             self.interface.echo_output()
 
@@ -642,9 +656,9 @@ class actr():
         return self.evaluate_single(command,*parameters)
 
 
-def start(host,port):
+def start(host,port,tap=None):
     try:
-        a = actr(host=host,port=port)
+        a = actr(host=host,port=port,tap=tap)
     except:
         print("Failed to connect to ACT-R with exception",sys.exc_info())
 
@@ -657,12 +671,11 @@ def start(host,port):
 
 def stop(c):
     print("Closing down ACT-R connection.")
-    c.interface.connected = False
-    c.interface.sock.close()
+    c.interface.close()
     c = None
 
 class interface():
-    def __init__(self,host,port):
+    def __init__(self,host,port,tap=None):
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         try:
 
@@ -671,6 +684,9 @@ class interface():
             self.connected = False
             print("Error trying to connect to ACT-R at",host,":",port,"with exception",sys.exc_info())
         else:
+            # tap(sock) may return a wrapper which sees every byte sent and received.
+            if tap:
+                self.sock = tap(self.sock)
             self.connected = True
             self.cmd_id = 1
             self.actions = {}
@@ -681,35 +697,106 @@ class interface():
             self.data_collector.daemon = True
             self.data_collector.start()       
             self.id_lock = threading.Lock()
+            # Acquired locks ready to be used by the next request.
+            self.wait_locks = collections.deque()
             self.echo_count = 0
             self.echo = False
             self.show_output = True
+            self.trace_listeners = []
+            # Seconds send waits for a result when no timeout is given (None: forever).
+            self.default_timeout = None
+            self.heartbeat = None
+            # Requests sent by the heartbeat, so callers can leave them out of their counts.
+            self.heartbeats = 0
+
+    def wait_lock(self):
+        try:
+            return self.wait_locks.pop()
+        except IndexError:
+            lock = threading.Lock()
+            lock.acquire()
+            return lock
 
-    def send(self,method,*params):
-        d = {}
-        r = request(self.cmd_id)
-        self.actions[self.cmd_id] = r
-
-        d['method'] = method
-        self.id_lock.acquire()
-        d['id'] = self.cmd_id
-        self.cmd_id += 1
-        self.id_lock.release()
-        d['params'] = params
-        
-        message = json.dumps(d) + chr(4)
-        
-        r.lock.acquire()
-        
-        self.stream_lock.acquire()
-        self.sock.sendall(message.encode('utf-8'))
-        self.stream_lock.release()
-        
-        while not r.complete:
-          r.cv.wait()
+    def send(self,method,*params,timeout=None):
+        if not self.connected:
+            raise connection_lost("ACT-R connection is closed, cannot send %s"%method)
 
+        if timeout is None:
+            timeout = self.default_timeout
+
+        with self.id_lock:
+            id = self.cmd_id
+            self.cmd_id += 1
+
+        lock = self.wait_lock()
+        r = request(id,lock)
+        self.actions[id] = r
+
+        message = json.dumps({'method': method, 'id': id, 'params': params}) + chr(4)
+        
+        try:
+            with self.stream_lock:
+                self.sock.sendall(message.encode('utf-8'))
+        except OSError as e:
+            self.close("send failed: %s"%(e,))
+            raise connection_lost("ACT-R connection lost while sending %s"%method)
+
+        if timeout is None:
+            lock.acquire()
+        elif not lock.acquire(timeout=max(timeout,0)):
+            if self.actions.pop(id,None) is r:
+                # Nobody can release it any more, so it is still ours to reuse.
+                self.wait_locks.append(lock)
+                raise request_timeout("No result for %s %s within %s seconds"%(method,params[:1],timeout))
+            # The result or a cancellation is being delivered right now.
+            lock.acquire()
+
+        self.wait_locks.append(lock)
+
+        if r.cancelled:
+            raise connection_lost("ACT-R connection lost while waiting for %s"%method)
         return [r.success] + r.results
 
+    def close(self,reason=None):
+        """Close the socket and wake every request still waiting for a result."""
+        if self.connected:
+            self.connected = False
+            if reason:
+                print("Closing ACT-R connection:",reason)
+            try:
+                # shutdown, not only close, so the peer and a blocked recv see the end.
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+        while True:
+            try:
+                _, r = self.actions.popitem()
+            except KeyError:
+                break
+            r.cancel()
+
+    def start_heartbeat(self,interval=10.0,timeout=30.0):
+        """Check the connection every interval seconds; close it if a check is not answered within timeout."""
+        def beat():
+            while self.connected:
+                time.sleep(interval)
+                self.heartbeats += 1
+                try:
+                    self.send("check","act-r-running-p",timeout=timeout)
+                except request_timeout:
+                    self.close("no heartbeat answer within %s seconds"%timeout)
+                except connection_lost:
+                    pass
+
+        if self.heartbeat is None:
+            self.heartbeat = threading.Thread(target=beat)
+            self.heartbeat.daemon = True
+            self.heartbeat.start()
+
 
     def add_command(self,name,function):
         self.commands[name] = function
@@ -720,9 +807,13 @@ class interface():
         while c:
             try:
                 data = self.sock.recv(4096)
+                if not data:
+                    raise ConnectionError("closed by ACT-R")
                 buffer += data.decode('utf-8')
                 while not chr(4) in buffer:
                     data = self.sock.recv(4096)
+                    if not data:
+                        raise ConnectionError("closed by ACT-R")
                     buffer += data.decode('utf-8')
                 while chr(4) in buffer:
                     pos = buffer.find(chr(4))
@@ -733,12 +824,16 @@ class interface():
             except:
                 if self.connected:
                     print("ACT-R connection error connection no longer available.")
+                self.close()
                 c = False
 
     def process_message (self,d):
         if 'result' in d.keys():
             id =d['id']
-            r = self.actions[id]
+            r = self.actions.pop(id,None)
+            if r is None:
+                # Result of a request that already timed out or was cancelled.
+                return
             if d['error'] is None:
                 r.success = True
                 r.results = d['result']
@@ -747,7 +842,6 @@ class interface():
                 errors=d['error']
                 r.results = [errors['message']]
 
-            self.actions.pop(id,None)
             r.notify_result()
         else:
             if d['method'] == "evaluate" and d['params'][0] in self.commands.keys():
@@ -809,6 +903,8 @@ class interface():
         self.stream_lock.release()
         
     def output_monitor(self,string):
+        for listener in self.trace_listeners:
+            listener(string)
         if self.show_output:
             print(string.rstrip())
         return True
@@ -0,0 +1,217 @@
+# analysis.py
+#
+# Learning-curve statistics over the self-play archive (save/play_record.pgn
+# and save/log.json). The PGN is streamed line by line into flat NumPy arrays
+# instead of being parsed into chess.pgn.Game trees; everything after that is
+# vectorized over games or plies.
+
+import argparse
+import json
+import os
+import re
+from datetime import datetime
+
+import chess
+import numpy as np
+
+from utils_chess import MaterialState
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+SAVE_DIR = os.path.join(ROOT_DIR, "save")
+
+HEADER = re.compile(r'^\[(\w+)\s+"(.*)"\]\s*$')
+CLOCK = re.compile(r"\[%clk\s+(-?[\d.]+)\]")
+COMMENT = re.compile(r"\{[^}]*\}")
+MOVE_NUMBER = re.compile(r"^\d+\.+$")
+
+RESULTS = {"1-0": 1, "0-1": -1, "1/2-1/2": 0}
+GAME_END = set(RESULTS) | {"*"}
+
+
+def _finish(games: dict, headers: dict, movetext: list, material: bool):
+    text = " ".join(movetext)
+    clocks = [float(c) for c in CLOCK.findall(text)]
+    sans = [t for t in COMMENT.sub(" ", text).split() if not MOVE_NUMBER.match(t) and t not in GAME_END]
+    try:
+        game_id = int(headers.get("ID", len(games["game_id"]) + 1))
+    except ValueError:
+        game_id = len(games["game_id"]) + 1
+    games["game_id"].append(game_id)
+    games["result"].append(RESULTS.get(headers.get("Result"), 2))
+    games["plies"].append(len(sans))
+    # Every move carries a [%clk]; pad so clocks stay aligned with plies.
+    games["clocks"].extend((clocks + [np.nan] * len(sans))[:len(sans)])
+    if material:
+        games["material"].extend(material_trajectory(sans))
+
+
+def material_trajectory(sans: list) -> list:
+    """White's material score after each ply (MaterialState, as shown on the board)."""
+    board = chess.Board()
+    state = MaterialState(board)
+    scores = []
+    for san in sans:
+        try:
+            move = board.parse_san(san)
+        except ValueError:
+            break
+        if board.is_en_passant(move):
+            captured = chess.Piece(chess.PAWN, not board.turn)
+        else:
+            captured = board.piece_at(move.to_square)
+        state.update(board.turn, captured, move.promotion)
+        board.push(move)
+        scores.append(state.score(chess.WHITE))
+    return scores + [scores[-1] if scores else 0] * (len(sans) - len(scores))
+
+
+def read_pgn(path: str, material: bool = False) -> dict:
+    """
+    One pass over the PGN. Per game: game_id, result (1 white win, -1 black
+    win, 0 draw, 2 unfinished) and plies; per ply, flattened in game order:
+    clocks (mover's clock after the move) and, if material, white's material score.
+    """
+    games = {"game_id": [], "result": [], "plies": [], "clocks": [], "material": []}
+    headers, movetext = {}, []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            match = HEADER.match(line)
+            if match:
+                if movetext:
+                    _finish(games, headers, movetext, material)
+                    headers, movetext = {}, []
+                headers[match.group(1)] = match.group(2)
+            elif line.strip():
+                movetext.append(line.strip())
+    if headers or movetext:
+        _finish(games, headers, movetext, material)
+
+    archive = {
+        "game_id": np.asarray(games["game_id"], dtype=np.int64),
+        "result": np.asarray(games["result"], dtype=np.int8),
+        "plies": np.asarray(games["plies"], dtype=np.int32),
+        "clocks": np.asarray(games["clocks"], dtype=np.float32),
+    }
+    if material:
+        archive["material"] = np.asarray(games["material"], dtype=np.int16)
+    return archive
+
+
+def read_log(path: str) -> dict:
+    """game_id and timestamp (epoch seconds) of each entry in log.json, in game order."""
+    with open(path, encoding="utf-8") as f:
+        entries = list(json.load(f).values())
+    ids = np.asarray([int(e["game_id"]) for e in entries], dtype=np.int64)
+    stamps = np.asarray([datetime.fromisoformat(e["timestamp"]).timestamp() for e in entries])
+    order = np.argsort(stamps, kind="stable")
+    return {"game_id": ids[order], "timestamp": stamps[order]}
+
+
+def think_times(plies: np.ndarray, clocks: np.ndarray, time_limit: float) -> np.ndarray:
+    """Seconds each ply took off the mover's clock."""
+    starts = np.repeat(np.cumsum(plies) - plies, plies)
+    ply_index = np.arange(len(clocks)) - starts
+    previous = np.full(len(clocks), time_limit, dtype=np.float64)
+    later = ply_index >= 2
+    previous[later] = clocks[np.nonzero(later)[0] - 2]
+    return previous - clocks
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Mean over the last `window` values (fewer at the start)."""
+    sums = np.cumsum(np.asarray(values, dtype=np.float64))
+    sums[window:] = sums[window:] - sums[:-window]
+    return sums / np.minimum(np.arange(1, len(values) + 1), window)
+
+
+def learning_curve(archive: dict, window: int, time_limit: float, log: dict = None) -> dict:
+    """Per generation of `window` consecutive games: rates, length, think-time percentiles."""
+    result = archive["result"]
+    plies = archive["plies"]
+    n = len(result)
+    generation = np.arange(n) // window
+    generations = int(generation[-1]) + 1 if n else 0
+    count = np.bincount(generation, minlength=generations)
+
+    def per_generation(values):
+        return np.bincount(generation, weights=values, minlength=generations) / np.maximum(count, 1)
+
+    think = think_times(plies, archive["clocks"], time_limit)
+    ply_generation = np.repeat(generation, plies)
+    valid = ~np.isnan(think)
+    order = np.lexsort((think[valid], ply_generation[valid]))
+    sorted_think = think[valid][order]
+    bounds = np.searchsorted(ply_generation[valid][order], np.arange(generations + 1))
+    percentiles = np.full((generations, 3), np.nan)
+    for g in range(generations):
+        chunk = sorted_think[bounds[g]:bounds[g + 1]]
+        if len(chunk):
+            percentiles[g] = np.percentile(chunk, (10, 50, 90))
+
+    curve = {
+        "first_game": archive["game_id"][np.searchsorted(generation, np.arange(generations))],
+        "games": count,
+        "white_win_rate": per_generation(result == 1),
+        "black_win_rate": per_generation(result == -1),
+        "draw_rate": per_generation(result == 0),
+        "mean_plies": per_generation(plies),
+        "think_p10": percentiles[:, 0],
+        "think_p50": percentiles[:, 1],
+        "think_p90": percentiles[:, 2],
+        "rolling_white_win_rate": rolling_mean(result == 1, window),
+        "rolling_draw_rate": rolling_mean(result == 0, window),
+    }
+    if "material" in archive:
+        final = archive["material"][np.cumsum(plies)[plies > 0] - 1]
+        finals = np.zeros(n)
+        finals[plies > 0] = final
+        curve["mean_final_material"] = per_generation(finals)
+    if log is not None and len(log["timestamp"]) > 1:
+        # Wall seconds between consecutive logged games, attributed to the later game.
+        position = {gid: i for i, gid in enumerate(archive["game_id"].tolist())}
+        gaps = np.diff(log["timestamp"])
+        index = np.asarray([position.get(gid, -1) for gid in log["game_id"][1:].tolist()])
+        known = index >= 0
+        seconds = np.bincount(generation[index[known]], weights=gaps[known], minlength=generations)
+        logged = np.bincount(generation[index[known]], minlength=generations)
+        curve["wall_seconds_per_game"] = np.where(logged > 0, seconds / np.maximum(logged, 1), np.nan)
+    return curve
+
+
+def format_curve(curve: dict) -> str:
+    columns = ["first_game", "games", "white_win_rate", "draw_rate", "mean_plies", "think_p50", "think_p90"]
+    columns += [c for c in ("mean_final_material", "wall_seconds_per_game") if c in curve]
+    lines = [" ".join(f"{c:>14}" for c in columns)]
+    for g in range(len(curve["games"])):
+        lines.append(" ".join(f"{curve[c][g]:>14.3f}" if curve[c].dtype.kind == "f" else f"{curve[c][g]:>14}"
+                              for c in columns))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Learning curves over the self-play archive')
+    parser.add_argument('--pgn', type=str, default=os.path.join(SAVE_DIR, "play_record.pgn"))
+    parser.add_argument('--log', type=str, default=os.path.join(SAVE_DIR, "log.json"))
+    parser.add_argument('--window', type=int, default=100, help='Games per generation')
+    parser.add_argument('--time_limit', type=float, default=600, help='Starting clock used for the first think times')
+    parser.add_argument('--material', action='store_true',
+                        help='Also replay the moves for material trajectories (much slower)')
+    parser.add_argument('--out', type=str, default=None, help='Save the arrays and the curve to this .npz file')
+    args = parser.parse_args()
+
+    archive = read_pgn(args.pgn, args.material)
+    log = read_log(args.log) if os.path.exists(args.log) else None
+    if not len(archive["result"]):
+        print("No games found.")
+        return
+    curve = learning_curve(archive, args.window, args.time_limit, log)
+    print(f"{len(archive['result'])} games, {int(archive['plies'].sum())} plies")
+    print(format_curve(curve))
+
+    if args.out:
+        np.savez_compressed(args.out, **archive, **{"curve_" + k: v for k, v in curve.items()})
+        print(f"Saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
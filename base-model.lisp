@@ -8,15 +8,47 @@
 (defparameter *board-off-y* 380) 
     
 
+;;; Lookup tables, built once at load
+(defparameter *square-table* (make-hash-table :test 'equalp))      ; \"e4\" -> (col . row)
+(defparameter *square-symbols* (make-array '(9 9) :initial-element nil)) ; [col row] -> |e4|
+(defparameter *name-unicode-table* (make-hash-table :test 'equalp)) ; \"k\" -> \"♚\"
+(defparameter *unicode-name-table* (make-hash-table :test 'equalp)) ; \"♚\"/\"♔\" -> k
+(defparameter *symbol-score-table* (make-hash-table :test 'equalp)) ; symbol names, any case
+(defparameter *string-score-table* (make-hash-table :test 'equal))  ; strings, case-sensitive
+
+(dotimes (c 8)
+  (dotimes (r 8)
+    (let* ((col (1+ c))
+           (row (1+ r))
+           (name (format nil \"~c~d\" (code-char (+ col 96)) row)))
+      (setf (gethash name *square-table*) (cons col row))
+      (setf (aref *square-symbols* col row) (intern name)))))
+
+(dolist (entry '((\"k\" \"♚\" \"♔\" k 100)
+                 (\"q\" \"♛\" \"♕\" q 9)
+                 (\"r\" \"♜\" \"♖\" r 5)
+                 (\"b\" \"♝\" \"♗\" b 3)
+                 (\"n\" \"♞\" \"♘\" n 3)
+                 (\"p\" \"♟\" \"♙\" p 1)))
+  (destructuring-bind (name black white sym score) entry
+    (setf (gethash name *name-unicode-table*) black)
+    (setf (gethash black *unicode-name-table*) sym)
+    (setf (gethash white *unicode-name-table*) sym)
+    (dolist (key (list name black))
+      (setf (gethash key *symbol-score-table*) score)
+      (setf (gethash key *string-score-table*) score))))
+
 (defun loc-to-col-idx (loc)
-  (let* ((s (string loc))
-         (c (char-code (char (string-downcase s) 0))))
-    (- c 96)))
+  (let ((sq (gethash (string loc) *square-table*)))
+    (if sq
+        (car sq)
+        (- (char-code (char (string-downcase (string loc)) 0)) 96))))
 
 (defun loc-to-row-idx (loc)
-  (let* ((s (string loc))
-         (c (digit-char-p (char s 1))))
-    c))
+  (let ((sq (gethash (string loc) *square-table*)))
+    (if sq
+        (cdr sq)
+        (digit-char-p (char (string loc) 1)))))
 
 (defun rel-to-abs-lx (loc)
   (let ((col (if (numberp loc) loc (loc-to-col-idx loc))))
@@ -39,35 +71,18 @@
   (+ (rel-to-abs-ly loc) (/ *cell-width* 2)))
 
 (defun abs-xy-to-loc (x y)
-  (let* ((col-idx (floor (+ (/ (- x *board-off-x*) *cell-width*) 1)))
-         (row-idx (floor (+ (/ (- y *board-off-y*) *cell-width*) 1)))
-         (col-char (code-char (+ col-idx 96)))) 
+  (let ((col-idx (floor (+ (/ (- x *board-off-x*) *cell-width*) 1)))
+        (row-idx (floor (+ (/ (- y *board-off-y*) *cell-width*) 1))))
     (if (and (>= col-idx 1) (<= col-idx 8)
              (>= row-idx 1) (<= row-idx 8))
-        (intern (format nil \"~c~d\" col-char row-idx))
+        (aref *square-symbols* col-idx row-idx)
         nil)))
 
 (defun name-to-unicode (name)
-  (let ((n (string-downcase (string name))))
-    (cond
-      ((string= n \"k\") \"♚\")
-      ((string= n \"q\") \"♛\")
-      ((string= n \"r\") \"♜\")
-      ((string= n \"b\") \"♝\")
-      ((string= n \"n\") \"♞\")
-      ((string= n \"p\") \"♟\")
-      (t \"?\"))))
+  (gethash (string name) *name-unicode-table* \"?\"))
 
 (defun unicode-to-name (uni)
-  (let ((u (if (stringp uni) uni (string uni))))
-    (cond
-      ((or (string= u \"♚\") (string= u \"♔\")) 'k)
-      ((or (string= u \"♛\") (string= u \"♕\")) 'q)
-      ((or (string= u \"♜\") (string= u \"♖\")) 'r)
-      ((or (string= u \"♝\") (string= u \"♗\")) 'b)
-      ((or (string= u \"♞\") (string= u \"♘\")) 'n)
-      ((or (string= u \"♟\") (string= u \"♙\")) 'p)
-      (t nil))))
+  (values (gethash (string uni) *unicode-name-table*)))
 
 (defun opposite-color (c)
   (let ((cs (string-downcase (string c))))
@@ -76,19 +91,99 @@
           (t nil))))
 
 (defun get-piece-score (piece-or-uni)
-  (let ((s (if (symbolp piece-or-uni) 
-               (string-downcase (symbol-name piece-or-uni))
-               (string piece-or-uni))))
-    (cond
-      ((or (string= s \"♚\") (string= s \"k\")) 100)
-      ((or (string= s \"♛\") (string= s \"q\")) 9)
-      ((or (string= s \"♜\") (string= s \"r\")) 5)
-      ((or (string= s \"♝\") (string= s \"b\")) 3)
-      ((or (string= s \"♞\") (string= s \"n\")) 3)
-      ((or (string= s \"♟\") (string= s \"p\")) 1)
-      (t 0))))
+  (if (symbolp piece-or-uni)
+      (gethash (symbol-name piece-or-uni) *symbol-score-table* 0)
+      (gethash (string piece-or-uni) *string-score-table* 0)))
+
+;;; Legal-move oracle (command registered by experiment.py)
+(defparameter *use-move-oracle* nil) ; t: phase 2 asks the oracle instead of scanning for gray dots
+
+(defun oracle-destination (piece)
+  \"A random legal destination for the piece chunk, or none.\"
+  (let ((dests (evaluate-act-r-command \"chess-legal-destinations\"
+                                       (string (chunk-slot-value-fct piece 'l)))))
+    (if (consp dests)
+        (intern (nth (act-r-random (length dests)) dests))
+        'none)))
+
+;;; Move evaluator (command registered by experiment.py)
+(defparameter *use-move-evaluator* nil) ; t: phase 3 scores moves with one evaluator call
+
+(defun evaluator-score (piece dest)
+  \"Exchange-aware score of moving piece to dest, 0 if the evaluator has no answer.\"
+  (let ((score (evaluate-act-r-command \"chess-evaluate-move\"
+                                       (string (chunk-slot-value-fct piece 'l))
+                                       (string dest))))
+    (if (numberp score) score 0)))
+
+;;; Cross-game position cache (commands registered by experiment.py)
+(defparameter *use-position-cache* nil) ; t: look scores up by position before recalling them
+
+(defun mv-from-loc (mv)
+  (string (chunk-slot-value-fct (chunk-slot-value-fct mv 'agent) 'l)))
+
+(defun cached-score (mv)
+  \"Score cached for the mv chunk in the current position, or none.\"
+  (let ((score (evaluate-act-r-command \"chess-cache-lookup\"
+                                       (mv-from-loc mv)
+                                       (string (chunk-slot-value-fct mv 'dest)))))
+    (if (numberp score) score 'none)))
+
+(defun cache-store-score (mv score)
+  (when *use-position-cache*
+    (evaluate-act-r-command \"chess-cache-store\"
+                            (mv-from-loc mv)
+                            (string (chunk-slot-value-fct mv 'dest))
+                            score)))
+
+;;; Bulk seeding of the board as pic chunks (called from experiment.py)
+(defun seed-chess-pics (specs)
+  \"Merge a pic chunk for each (name loc color) in specs into DM with one merge-dm-fct
+   call, so a square seen again strengthens its chunk instead of adding a copy.
+   Values are interned the way the perception productions build them.\"
+  (when specs
+    (merge-dm-fct (mapcar (lambda (spec)
+                          (destructuring-bind (n l c) spec
+                            (list 'isa 'pic
+                                  'n (intern (string-upcase (string n)))
+                                  'l (intern (string-downcase (string l)))
+                                  'c (intern (string-upcase (string c))))))
+                        specs)))
+  t)
+
+(add-act-r-command \"seed-chess-pics\" 'seed-chess-pics \"Merge pic chunks for board pieces into DM. Params: ((name loc color) ...)\")
+
+(defun drain-model-events (max-time)
+  \"Run in short steps while events are pending, for at most max-time model seconds.
+   Returns the model seconds run; 0 when nothing was pending.\"
+  (let ((start (mp-time)))
+    ;; bounded by steps, not by the clock, in case pending events never advance it
+    (loop repeat (ceiling max-time 0.05)
+          while (plusp (mp-queue-count))
+          do (run 0.05))
+    (- (mp-time) start)))
+
+(add-act-r-command \"drain-model-events\" 'drain-model-events \"Run until no events are pending. Params: max-time\")
 
 ;;; Time Management Helpers
+(defparameter *urgent-productions* :unset) ; cached at model load, see cache-urgent-productions
+(defparameter *urgent-bucket* nil)         ; whole seconds of turn time last used for the boost
+(defparameter *current-egs* nil)           ; :egs last set by set-egs, nil when unknown
+(defvar *time-pressure-monitored* nil)     ; clear-time-pressure-state is monitoring reset/clear-all
+
+(defun clear-time-pressure-state (&rest ignore)
+  \"Forget the cached productions, boost bucket and :egs; the model they belong to is being reset.\"
+  (declare (ignore ignore))
+  (setf *urgent-productions* :unset
+        *urgent-bucket* nil
+        *current-egs* nil))
+
+(add-act-r-command \"clear-time-pressure-state\" 'clear-time-pressure-state \"Clears cached time-pressure state on reset. Do not call directly.\")
+(unless *time-pressure-monitored*
+  (monitor-act-r-command \"reset-start\" \"clear-time-pressure-state\")
+  (monitor-act-r-command \"clear-all-start\" \"clear-time-pressure-state\")
+  (setf *time-pressure-monitored* t))
+
 (defun get-turn-duration ()
   (let ((g (buffer-read 'goal)))
     (if (and g (chunk-p g))
@@ -98,62 +193,288 @@
               0))
         0)))
 
+(defun cache-urgent-productions ()
+  (setf *urgent-productions*
+        (remove-if-not (lambda (prod) (search \"URGENT\" (symbol-name prod) :test #'string-equal))
+                       (all-productions))))
+
+(defun urgent-productions ()
+  (if (eq *urgent-productions* :unset)
+      (cache-urgent-productions)
+      *urgent-productions*))
+
+(defun set-egs (value)
+  (unless (eql *current-egs* value)
+    (sgp-fct (list :egs value))
+    (setf *current-egs* value)))
+
+(defun set-urgent-utility (u)
+  (dolist (prod (urgent-productions))
+    (spp-fct (list prod :u u))))
+
 (defun manage-time-pressure (prod-name)
   (let* ((duration (get-turn-duration))
          (threshold 10.0)      
          (base-noise 0.1)      
          (base-utility 3.0))   
 
-    (let ((new-noise (if (> duration threshold)
-                         (+ base-noise (* (- duration threshold) 0.05))
-                         base-noise)))
-      (sgp-fct (list :egs new-noise)))
+    (set-egs (if (> duration threshold)
+                 (+ base-noise (* (- duration threshold) 0.05))
+                 base-noise))
 
     (when (> duration threshold)
-      (let ((boost (* (- duration threshold) 1.0)))
-        (dolist (prod (all-productions)) 
-          (when (search \"URGENT\" (symbol-name prod) :test #'string-equal)
-            (spp-fct (list prod :u (+ base-utility boost)))))))))
+      (let ((bucket (floor duration)))
+        (unless (eql bucket *urgent-bucket*)
+          (setf *urgent-bucket* bucket)
+          (set-urgent-utility (+ base-utility (* (- duration threshold) 1.0))))))
+    nil))
 
 (defun reset-turn-time ()
   (let ((g (buffer-read 'goal)))
     (when g
       (mod-chunk-fct g (list 'start-time (mp-time)))
-      (sgp :egs 0.3) 
-      (dolist (prod (all-productions))
-          (when (search \"URGENT\" (symbol-name prod) :test #'string-equal)
-            (spp-fct (list prod :u 3.0)))) 
-      )))
+      (set-egs 0.3)
+      (setf *urgent-bucket* nil)
+      (set-urgent-utility 3.0))))
 ")
 
 
 (defparameter *chess-saver-code* "
+;;; DM consolidation, run by save-chess-model before the snapshot is written
+(defparameter *dm-consolidate-on-save* t)
+(defparameter *dm-type-slots* '((pic n l c)
+                                (mv agent dest)
+                                (rel r a ac ta tc)
+                                (score m s)
+                                (tac rel1 rel2 v)
+                                (rlc d o front r l agent target)))
+(defparameter *dm-type-caps* '((pic . 1000) (mv . 2000) (rel . 1000) (score . 2000) (tac . 500) (rlc . 500)))
+
+(defun dm-chunk-params (chunk)
+  (car (no-output (sdp-fct (list chunk :creation-time :reference-count :reference-list)))))
+
+(defun dm-chunk-better-p (a b params)
+  \"Rank by reference count, then most recent creation.  The model runs without
+   :bll, so base-level is the constant :blc and cannot tell chunks apart.\"
+  (destructuring-bind (ct-a rc-a rl-a) (gethash a params)
+    (declare (ignore rl-a))
+    (destructuring-bind (ct-b rc-b rl-b) (gethash b params)
+      (declare (ignore rl-b))
+      (if (/= rc-a rc-b)
+          (> rc-a rc-b)
+          (> ct-a ct-b)))))
+
+(defun merged-dm-params (rep others params)
+  \"Parameters of rep with the creation time, references and reference list of others folded in.\"
+  (let ((p (copy-list (gethash rep params))))
+    (dolist (o others p)
+      (destructuring-bind (ct rc rl) (gethash o params)
+        (setf (first p) (min (first p) ct))
+        (setf (second p) (+ (second p) rc))
+        (setf (third p) (sort (append (third p) rl) #'>))))))
+
+(defun dm-chunk-kind (chunk)
+  \"The type in *dm-type-slots* with the fewest slots that covers every filled
+   slot of chunk, or nil.  isa in a chunk-spec does not restrict a match in
+   ACT-R 7, so chunks are classified by their slots.\"
+  (let ((filled (chunk-filled-slots-list chunk))
+        (best nil))
+    (when filled
+      (dolist (entry *dm-type-slots* (car best))
+        (when (and (subsetp filled (cdr entry))
+                   (or (null best) (< (length (cdr entry)) (length (cdr best)))))
+          (setf best entry))))))
+
+(defun consolidate-chess-dm ()
+  \"Merge duplicate chunks of the types in *dm-type-slots* and drop the ones
+   beyond the per-type cap.  Chunks still
+   referenced from a kept chunk are always kept, and then keep their own
+   counts; only duplicates which are removed are folded into the kept one.
+   Returns (type kept merged evicted) per type.\"
+  (let ((all (no-output (sdm)))
+        (kind (make-hash-table))
+        (params (make-hash-table))
+        (rank (make-hash-table))
+        (dups (make-hash-table))
+        (keep (make-hash-table))
+        (merged (make-hash-table))
+        (report nil))
+    (dolist (c all)
+      (setf (gethash c params) (dm-chunk-params c))
+      (let ((type (dm-chunk-kind c)))
+        (if type
+            (setf (gethash c kind) type)
+            (setf (gethash c keep) t))))
+
+    (dolist (entry *dm-type-slots*)
+      (let ((type (car entry))
+            (groups (make-hash-table :test 'equal))
+            (reps nil)
+            (cap (cdr (assoc (car entry) *dm-type-caps*))))
+        (dolist (c all)
+          (when (eq (gethash c kind) type)
+            (push c (gethash (mapcar (lambda (s) (chunk-slot-value-fct c s)) (cdr entry)) groups))))
+        (maphash (lambda (sig members)
+                   (declare (ignore sig))
+                   (let ((sorted (sort members (lambda (a b) (dm-chunk-better-p a b params)))))
+                     (setf (gethash (car sorted) dups) (cdr sorted))
+                     ;; ranked as if every duplicate were merged into it
+                     (setf (gethash (car sorted) rank) (merged-dm-params (car sorted) (cdr sorted) params))
+                     (push (car sorted) reps)))
+                 groups)
+        (setf reps (sort reps (lambda (a b) (dm-chunk-better-p a b rank))))
+        (when (and cap (> (length reps) cap))
+          (setf reps (subseq reps 0 cap)))
+        (dolist (c reps)
+          (setf (gethash c keep) t))))
+
+    ;; keep everything reachable from a kept chunk so no slot is left dangling
+    (let ((work (loop for c being the hash-keys of keep collect c)))
+      (loop while work
+            do (let ((c (pop work)))
+                 (dolist (slot (chunk-filled-slots-list c))
+                   (let ((v (chunk-slot-value-fct c slot)))
+                     (when (and (symbolp v) (gethash v params) (not (gethash v keep)))
+                       (setf (gethash v keep) t)
+                       (push v work)))))))
+
+    ;; fold only the duplicates that are actually removed into their kept representative
+    (maphash (lambda (rep others)
+               (when (gethash rep keep)
+                 (let ((removed (remove-if (lambda (o) (gethash o keep)) others)))
+                   (dolist (o removed)
+                     (setf (gethash o merged) t))
+                   (when removed
+                     (setf (gethash rep params) (merged-dm-params rep removed params))))))
+             dups)
+
+    (dolist (entry *dm-type-slots*)
+      (let ((type (car entry)) (kept 0) (dups 0) (evicted 0))
+        (dolist (c all)
+          (when (eq (gethash c kind) type)
+            (cond ((gethash c keep) (incf kept))
+                  ((gethash c merged) (incf dups))
+                  (t (incf evicted)))))
+        (model-output \"DM consolidation ~a: kept ~d, merged ~d, evicted ~d\" type kept dups evicted)
+        (push (list type kept dups evicted) report)))
+
+    ;; ACT-R has no call to remove one chunk from DM, so DM is rebuilt from the
+    ;; kept chunks.  Creation time and references are all the per-chunk state
+    ;; this model has (no :bll, :mas or :pas), and exactly what the snapshot
+    ;; saved next records, so the resident model matches a reload of it.
+    (when (< (hash-table-count keep) (length all))
+      (let ((kept (remove-if-not (lambda (c) (gethash c keep)) all)))
+        (clear-dm)
+        (add-dm-chunks-fct kept)
+        (dolist (c kept)
+          (destructuring-bind (ct rc rl) (gethash c params)
+            (when rl
+              (sdp-fct (list c :reference-list rl)))
+            (sdp-fct (list c :creation-time ct :reference-count rc))))))
+    (nreverse report)))
+
 (defun restore-custom-functions ()
   (command-output \";; ---------------------------------------------------------\")
   (command-output \";; Recursive Restoration of Custom Functions and Saver Mechanism\")
   (command-output \";; ---------------------------------------------------------\")
   
+  (command-output \"(defparameter *chess-loader-code* ~s)\" *chess-loader-code*)
   (command-output \"(defparameter *chess-logic-code* ~s)\" *chess-logic-code*)
   (command-output \"(defparameter *chess-saver-code* ~s)\" *chess-saver-code*)
 
-   (command-output \"~a\" *chess-logic-code*)
-  (command-output \"~a\" *chess-saver-code*)
+  (command-output \"~a\" *chess-loader-code*)
+  (command-output \"(load-code-string *chess-logic-code*)\")
+  (command-output \"(load-code-string *chess-saver-code*)\")
 )
 
 (add-act-r-command \"restore-custom-functions\" 'restore-custom-functions \"Recursively restores functions.\")
 
 (defun save-chess-model (file-name)
-  (save-model-file file-name :pre-chunk-type-hook \"restore-custom-functions\"))
+  (let ((report (when *dm-consolidate-on-save* (consolidate-chess-dm))))
+    (save-model-file file-name :pre-chunk-type-hook \"restore-custom-functions\")
+    report))
 
 (add-act-r-command \"save-chess-model\" 'save-chess-model \"Saves model recursively.\")
 ")
 
-(defun load-code-string (str)
+(defparameter *chess-loader-code* "
+(defvar *chess-code-cache-dir*
+  (merge-pathnames \"fasl-cache/\"
+                   (make-pathname :name nil :type nil
+                                  :defaults (or *load-truename* *default-pathname-defaults*))))
+
+(defvar *chess-code-fasls* (make-hash-table :test 'equal)) ; key -> fasl loaded in this image
+(defvar *chess-code-failed* (make-hash-table :test 'equal)) ; keys that could not be compiled or loaded
+
+(defun code-string-key (str)
+  (let ((h 2166136261))
+    (flet ((mix (s)
+             (loop for ch across s
+                   do (setf h (logand #xffffffff (* (logxor h (char-code ch)) 16777619))))))
+      (mix (lisp-implementation-type))
+      (mix (lisp-implementation-version))
+      (mix str))
+    (format nil \"~8,'0x\" h)))
+
+(defun eval-code-string (str)
   (with-input-from-string (s str)
     (loop for form = (read s nil :eof)
           until (eq form :eof)
           do (eval form))))
 
+(defun compile-code-string (str fasl)
+  \"Compile str to fasl through temporary files renamed into place, so that
+   a concurrent or interrupted compile never leaves a partial fasl there.\"
+  (let* ((tag (format nil \"~a-~a\" (get-universal-time) (random 1000000 (make-random-state t))))
+         (source (make-pathname :name (format nil \"~a-~a\" (pathname-name fasl) tag)
+                                :type \"lisp\" :defaults fasl))
+         (temp (compile-file-pathname source)))
+    (ensure-directories-exist source)
+    (unwind-protect
+         (progn
+           (with-open-file (out source :direction :output :if-exists :supersede)
+             (write-string str out))
+           (let ((*compile-verbose* nil)
+                 (*compile-print* nil))
+             (unless (compile-file source :output-file temp)
+               (error \"compile-file produced no output\")))
+           ;; Another image may have finished the same code first.
+           (unless (probe-file fasl)
+             (rename-file temp fasl)))
+      (when (probe-file source) (delete-file source))
+      (when (probe-file temp) (delete-file temp)))))
+
+(defun load-code-string (str)
+  (let* ((key (code-string-key str))
+         (fasl (compile-file-pathname
+                (merge-pathnames (format nil \"chess-code-~a.lisp\" key) *chess-code-cache-dir*)))
+         ;; Left next to the fasl so other images skip a compile that already failed.
+         (marker (make-pathname :type \"failed\" :defaults fasl)))
+    (if (or (gethash key *chess-code-failed*) (probe-file marker))
+        (eval-code-string str)
+        (handler-case
+            (progn
+              (unless (or (gethash key *chess-code-fasls*) (probe-file fasl))
+                (compile-code-string str fasl))
+              (load fasl)
+              (setf (gethash key *chess-code-fasls*) fasl))
+          (error (e)
+            ;; The fasl is shared with other images and may be in use, so it stays.
+            (setf (gethash key *chess-code-failed*) t)
+            (ignore-errors
+             (with-open-file (out marker :direction :output :if-exists :supersede)
+               (format out \"~a~%\" e)))
+            (print-warning \"Could not load compiled chess code ~a (~a), evaluating it instead.\" key e)
+            (eval-code-string str))))))
+")
+
+;; Compiled-code cache: each code string is compiled once to a fasl keyed by
+;; its hash and loaded from there on every later load, reset or snapshot.
+(with-input-from-string (s *chess-loader-code*)
+  (loop for form = (read s nil :eof)
+        until (eq form :eof)
+        do (eval form)))
+
 (load-code-string *chess-logic-code*)
 (load-code-string *chess-saver-code*)
 
@@ -174,6 +495,8 @@
         next-move ; planned best move for this turn.
         con ; current context
         next-move-execute ;if t, discovering planned move
+        oracle-dest ; destination proposed by the legal-move oracle
+        cached-score ; score found in the position cache, none on a miss
     )
     (chunk-type pic
         n ; name (p,b,r,n,q,k)
@@ -790,6 +1113,7 @@
         target =tar
    ?retrieval>
       state  free 
+   !eval! (not *use-move-oracle*)
   ==>
     =goal>
         action      2-recall-move
@@ -797,6 +1121,77 @@
         isa mv
         agent =tar
 )
+;--------- oracle alternative to 2-1 ... 2-4 (enabled by *use-move-oracle*)
+(p 2-1-o-ask-oracle
+   =goal>
+      isa         game-state
+      action      2-specify-move
+      target      =tar
+   !eval! *use-move-oracle*
+   !bind! =dest (oracle-destination =tar)
+==>
+   =goal>
+      action      2-o-destination
+      oracle-dest =dest
+)
+
+(p 2-1-o-a-recall-move
+   =goal>
+      isa         game-state
+      action      2-o-destination
+      target      =tar
+      oracle-dest =dest
+    - oracle-dest none
+   ?retrieval>
+      state       free
+==>
+   =goal>
+      action      2-o-try-move-recall
+   +retrieval>
+      isa         mv
+      agent       =tar
+      dest        =dest
+)
+
+(p 2-1-o-b-no-destination
+   =goal>
+      isa         game-state
+      action      2-o-destination
+      oracle-dest none
+==>
+   =goal>
+      action      target-find
+      target      nil
+      oracle-dest nil
+)
+
+(p 2-1-o-2-a-success-move-recall
+   =goal>
+      action      2-o-try-move-recall
+   =retrieval>
+      isa         mv
+==>
+   =retrieval>
+   =goal>
+      action      2-recall-score
+)
+
+(p 2-1-o-2-b-failed-move-recall
+   =goal>
+      action      2-o-try-move-recall
+      target      =tar
+      oracle-dest =dest
+   ?retrieval>
+      state       error
+==>
+   +imaginal>
+      isa         mv
+      agent       =tar
+      dest        =dest
+   =goal>
+      action      3-eval
+      oracle-dest nil
+)
 (p 2-2-a-1-valid-move
    =goal>
    isa game-state
@@ -927,6 +1322,7 @@
    =goal>
    action 2-recall-score
    =retrieval>
+   !eval! (not *use-position-cache*)
 ==>
    =goal>
    action 2-check-score
@@ -934,6 +1330,48 @@
    isa score
    m =retrieval   
 )
+(p 2-5-c-ask-cache
+   =goal>
+   action 2-recall-score
+   =retrieval>
+   isa mv
+   !eval! *use-position-cache*
+   !bind! =sc (cached-score =retrieval)
+==>
+   =retrieval>
+   =goal>
+   action 2-c-cache-checked
+   cached-score =sc
+)
+(p 2-5-c-a-cache-hit
+   =goal>
+   action 2-c-cache-checked
+   cached-score =sc
+ - cached-score none
+   =retrieval>
+==>
+   +imaginal>
+   isa score
+   m =retrieval
+   s =sc
+   =goal>
+   action 4-eval-move
+   cached-score nil
+   oracle-dest nil
+)
+(p 2-5-c-b-cache-miss
+   =goal>
+   action 2-c-cache-checked
+   cached-score none
+   =retrieval>
+==>
+   =goal>
+   action 2-check-score
+   cached-score nil
+   +retrieval>
+   isa score
+   m =retrieval
+)
 (p 2-5-1-a-1-positive-skip-eval
    =goal>
    action 2-check-score
@@ -944,6 +1382,7 @@
    =retrieval>
    =goal>
    action 4-decide
+   oracle-dest nil
 )
 (p 2-5-1-a-1-negative-skip-eval
    =goal>
@@ -955,6 +1394,7 @@
    =retrieval>
    =goal>
    action 4-decide
+   oracle-dest nil
 )
 (p 2-5-1-b-think-again
    =goal>
@@ -978,6 +1418,7 @@
    =goal>
    action 2-6-go-eval
    target =tar
+   oracle-dest nil
    =visual-location>   
    screen-x    =vx             
    screen-y    =vy
@@ -990,7 +1431,40 @@
    =goal>
    action 3-eval
 )
+; oracle moves were never looked at, so visual-location still holds the piece itself
+(p 2-6-o-go-eval
+   =goal>
+   action 2-6-go-eval
+   target =tar
+ - oracle-dest nil
+   oracle-dest =dest
+==>
+   +imaginal>
+   isa mv
+   agent =tar
+   dest =dest
+   =goal>
+   action 3-eval
+   oracle-dest nil
+)
 ;=========================================================phase 3===========================================================
+(p 3-0-0-evaluator
+   =goal>
+   action 3-eval
+   =imaginal>
+   isa mv
+   agent =ag
+   dest =loc
+   !eval! *use-move-evaluator*
+   !bind! =sc (evaluator-score =ag =loc)
+   ==>
+   +imaginal>
+   isa score
+   m =imaginal
+   s =sc
+   =goal>
+   action 4-eval-move
+)
 (p 3-0-1-mock
    =goal>
    action 3-eval
@@ -998,6 +1472,7 @@
    =imaginal>
    isa mv
    dest =loc
+   !eval! (not *use-move-evaluator*)
    !bind! =lx (rel-to-abs-lx =loc)
    !bind! =ux (rel-to-abs-ux =loc)
    !bind! =ly (rel-to-abs-ly =loc)
@@ -1022,6 +1497,7 @@
    state error
    =imaginal>
    ==>
+   !eval! (cache-store-score =imaginal 0)
    +imaginal>
    isa score
    m =imaginal
@@ -1051,6 +1527,7 @@
    !bind! =sc (get-piece-score =uni)
    =imaginal>
    ==>
+   !eval! (cache-store-score =imaginal =sc)
    =visual>
    +imaginal>
    isa score
@@ -1293,4 +1770,6 @@
       action      target-find 
       next-move   nil
 )
+
+(cache-urgent-productions)
 )
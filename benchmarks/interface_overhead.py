@@ -0,0 +1,99 @@
+# benchmarks/interface_overhead.py
+#
+# Round trips through actr.interface.send against a local responder that
+# answers every request immediately, so the numbers are the client's own
+# per-call overhead (request tracking, framing, wakeups) plus loopback.
+# Every caller checks it got its own answer back.
+#
+#   python benchmarks/interface_overhead.py --calls 20000 --threads 1 8 32
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import actr
+
+EOT = b"\x04"
+
+
+def responder(listener: socket.socket):
+    """Answers each request with its own params."""
+    while True:
+        try:
+            conn, _ = listener.accept()
+        except OSError:
+            return
+        threading.Thread(target=answer, args=(conn,), daemon=True).start()
+
+
+def answer(conn: socket.socket):
+    buffer = b""
+    while True:
+        data = conn.recv(65536)
+        if not data:
+            return
+        buffer += data
+        *messages, buffer = buffer.split(EOT)
+        replies = []
+        for message in messages:
+            d = json.loads(message)
+            if "method" in d:
+                replies.append(json.dumps({"id": d["id"], "result": d["params"], "error": None}).encode() + EOT)
+        conn.sendall(b"".join(replies))
+
+
+def run(port: int, calls: int, threads: int) -> dict:
+    conn = actr.interface("127.0.0.1", port)
+    per_thread = calls // threads
+    errors = []
+
+    def caller(k):
+        for i in range(per_thread):
+            tag = k * per_thread + i
+            r = conn.send("evaluate", "bench", tag)
+            if r != [True, "bench", tag]:
+                errors.append((tag, r))
+
+    workers = [threading.Thread(target=caller, args=(k,)) for k in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    seconds = time.perf_counter() - started
+    conn.connected = False
+    conn.sock.close()
+    total = per_thread * threads
+    return {
+        "threads": threads,
+        "calls": total,
+        "seconds": round(seconds, 3),
+        "calls_per_second": round(total / seconds),
+        "us_per_call": round(1e6 * seconds / total, 2),
+        "wrong_results": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='actr.interface request overhead')
+    parser.add_argument('--calls', type=int, default=20000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8, 32])
+    args = parser.parse_args()
+
+    listener = socket.create_server(("127.0.0.1", 0))
+    threading.Thread(target=responder, args=(listener,), daemon=True).start()
+    port = listener.getsockname()[1]
+    for threads in args.threads:
+        print(json.dumps(run(port, args.calls, threads)))
+    listener.close()
+
+
+if __name__ == "__main__":
+    main()
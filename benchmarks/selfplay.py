@@ -0,0 +1,125 @@
+# benchmarks/selfplay.py
+#
+# Runs a fixed number of short self-play games with fixed seeds and time
+# controls, and writes per-game and summary numbers to JSON so runs on
+# different commits can be compared.
+#
+#   python benchmarks/selfplay.py --games 3 --seed 7 --time_limit 120
+#   python benchmarks/selfplay.py --replay DIR      # stand-in servers, no ACT-R needed
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import replay
+
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+PHASES = ["load", "setup", "play", "review", "save"]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(games: list) -> dict:
+    if not games:
+        return {}
+    wall = sum(g["wall_seconds"] for g in games)
+    moves = sum(g["moves"] for g in games)
+    requests = sum(sum(g["requests"]) for g in games)
+    play_wall = sum(g["phases"].get("play", 0.0) for g in games)
+    model = sum(g["model_seconds"] for g in games)
+    return {
+        "games": len(games),
+        "wall_seconds": round(wall, 3),
+        "games_per_hour": round(3600 * len(games) / wall, 2) if wall else None,
+        "mean_wall_per_game": round(wall / len(games), 3),
+        "mean_phase_seconds": {p: round(sum(g["phases"].get(p, 0.0) for g in games) / len(games), 4) for p in PHASES},
+        "moves": moves,
+        "requests": requests,
+        "requests_per_move": round(requests / moves, 2) if moves else None,
+        "model_seconds": round(model, 3),
+        "play_wall_seconds": round(play_wall, 3),
+        "model_per_wall": round(model / play_wall, 3) if play_wall else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Self-play benchmark')
+    parser.add_argument('--games', type=int, default=3, help='Number of games')
+    parser.add_argument('--seed', type=int, default=1, help='Base :seed for both models')
+    parser.add_argument('--time_limit', type=int, default=120, help='Clock of each side in model seconds')
+    parser.add_argument('--replay', type=str, default=None,
+                        help='Directory of actr1.jsonl/actr2.jsonl to serve on 2650/2651 instead of live ACT-R')
+    parser.add_argument('--zero_latency', action='store_true', help='With --replay, answer without the recorded delays')
+    parser.add_argument('--record', type=str, default=None,
+                        help='Record the sessions into this directory for later --replay runs')
+    parser.add_argument('--out', type=str, default=None, help='Result file (default: benchmarks/results/<time>.json)')
+    parser.add_argument('extra', nargs=argparse.REMAINDER, help='Further experiment.py flags, after --')
+    args = parser.parse_args()
+
+    save_dir = tempfile.mkdtemp(prefix="actr-chess-bench-")
+    bench_file = os.path.join(save_dir, "bench.json")
+
+    replay_results = []
+    server = None
+    if args.replay:
+        sessions = [os.path.join(args.replay, "actr1.jsonl"), os.path.join(args.replay, "actr2.jsonl")]
+        latency = 0.0 if args.zero_latency else 1.0
+        server = threading.Thread(target=lambda: replay_results.extend(replay.serve(sessions, 2650, latency)),
+                                  daemon=True)
+        server.start()
+
+    command = [sys.executable, os.path.join(ROOT_DIR, "experiment.py"),
+               "--games", str(args.games), "--seed", str(args.seed), "--time_limit", str(args.time_limit),
+               "--save_dir", save_dir, "--bench_out", bench_file]
+    if args.record:
+        command += ["--record", args.record]
+    command += [a for a in args.extra if a != "--"]
+
+    print("Running:", " ".join(command))
+    exit_code = subprocess.run(command, cwd=ROOT_DIR).returncode
+    if server is not None:
+        server.join(timeout=replay.CLIENT_TIMEOUT)
+
+    games = []
+    if os.path.exists(bench_file):
+        with open(bench_file, encoding="utf-8") as f:
+            games = json.load(f)["games"]
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "settings": {"games": args.games, "seed": args.seed, "time_limit": args.time_limit,
+                     "replay": args.replay, "zero_latency": args.zero_latency, "extra": args.extra},
+        "exit_code": exit_code,
+        "summary": summarize(games),
+        "games": games,
+        "replay": replay_results,
+    }
+
+    out = args.out
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d_%H%M%S") + ".json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+
+    print(json.dumps(results["summary"], indent=4))
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
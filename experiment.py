@@ -1,18 +1,28 @@
-from utils_chess import PIECE_VALUES, both_sides_material_text, format_material_advantage, get_unicode
+from pool import ModelPool
+from replay import recorder
+from trace_profile import TraceProfiler, append_trace_csv, format_report
+from transposition import TranspositionCache, position_key, source_salt
+from utils_chess import PIECE_VALUES, MaterialState, collect_actr_state, evaluate_move, get_unicode, write_actr_state
 import os
 import chess
 import chess.pgn
+import numpy as np
 import actr
 import time
 import argparse
 import json
+import queue
+import threading
 from datetime import datetime
 
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 SAVE_DIR = os.path.join(ROOT_DIR, "save")
 MODEL_DIR = os.path.join(SAVE_DIR, "model")
+STATE_DIR = os.path.join(SAVE_DIR, "state")
 PGN_FILE = os.path.join(SAVE_DIR, "play_record.pgn")
 LOG_FILE = os.path.join(SAVE_DIR, "log.json")
+TRACE_FILE = os.path.join(SAVE_DIR, "trace_profile.csv")
+HISTORY_DIR = os.path.join(SAVE_DIR, "history")
 
 SQUARE_SIZE = 60
 START_X = 50
@@ -27,6 +37,30 @@ OP_SCORE_Y = 20
 INFO_COLOR = 'dark-cyan'
 GAME = None
 
+# Buffers holding per-game state that must be emptied when a model is kept
+# resident for the next game instead of being reset.
+GAME_STATE_BUFFERS = ["goal", "retrieval", "imaginal", "visual", "visual-location", "manual"]
+# Most model seconds a warm reset runs without a goal while events left by the review are pending.
+WARM_DRAIN_SECONDS = 5.0
+
+READY_TIMEOUT = 10.0
+READY_POLL_INTERVAL = 0.05
+# Set-ups of one game id that may fail the readiness check before it is skipped.
+READY_RETRIES = 3
+RECONNECT_DELAYS = (1, 2, 5, 10, 30, 60)
+
+# Each recorded history is reduced to at most HISTORY_SERIES named series
+# (productions, chunks) of HISTORY_BINS points over the game's model time.
+HISTORY_BINS = 32
+HISTORY_SERIES = 96
+HISTORY_DTYPE = np.dtype([
+    ("game_id", "<i4"),
+    ("history", "<i4"),
+    ("t0", "<f4"),
+    ("t1", "<f4"),
+    ("values", "<f4", (HISTORY_SERIES, HISTORY_BINS)),
+])
+
 # --- Helper Functions for Save/Load ---
 
 def ensure_directories():
@@ -37,6 +71,16 @@ def ensure_directories():
         os.makedirs(MODEL_DIR)
         print(f"Created directory: {MODEL_DIR}")
 
+def set_save_dir(path: str):
+    global SAVE_DIR, MODEL_DIR, STATE_DIR, PGN_FILE, LOG_FILE, TRACE_FILE, HISTORY_DIR
+    SAVE_DIR = os.path.abspath(path)
+    MODEL_DIR = os.path.join(SAVE_DIR, "model")
+    STATE_DIR = os.path.join(SAVE_DIR, "state")
+    PGN_FILE = os.path.join(SAVE_DIR, "play_record.pgn")
+    LOG_FILE = os.path.join(SAVE_DIR, "log.json")
+    TRACE_FILE = os.path.join(SAVE_DIR, "trace_profile.csv")
+    HISTORY_DIR = os.path.join(SAVE_DIR, "history")
+
 def get_next_game_id() -> int:
     if not os.path.exists(PGN_FILE):
         return 1
@@ -64,11 +108,13 @@ def append_pgn_game(game: chess.pgn.Game, game_id: int) -> None:
             exporter = chess.pgn.FileExporter(f)
             game.accept(exporter)
             f.write("\n\n")
+            f.flush()
+            os.fsync(f.fileno())
         print("PGN Saved successfully.")
     except Exception as e:
         print(f"Error saving PGN: {e}")
 
-def log_execution(game_id, model_file, result):
+def log_execution(game_id, model_file, result, opponent=None):
     log_data = {}
     if os.path.exists(LOG_FILE):
         try:
@@ -84,14 +130,189 @@ def log_execution(game_id, model_file, result):
         "result": result,
         "timestamp": timestamp
     }
+    if opponent is not None:
+        log_entry["opponent"] = opponent
     log_data[timestamp] = log_entry
     
+    # Write to a temporary file and swap it in, so an interrupted write
+    # never leaves a truncated log behind.
+    tmp_file = LOG_FILE + ".tmp"
     try:
-        with open(LOG_FILE, "w", encoding="utf-8") as f:
+        with open(tmp_file, "w", encoding="utf-8") as f:
             json.dump(log_data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, LOG_FILE)
     except Exception as e:
         print(f"Error saving log: {e}")
 
+def write_benchmark(path: str, results: dict):
+    tmp_file = path + ".tmp"
+    try:
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+        os.replace(tmp_file, path)
+    except Exception as e:
+        print(f"Error saving benchmark results: {e}")
+
+class ModelNotReady(Exception):
+    """The models' windows were not ready in time; the game is set up again under the same id."""
+
+class GameProfile:
+    """Wall seconds per phase, requests sent per model and model time of one game."""
+
+    def __init__(self, game_id: int, conns, started: float = None):
+        self.game_id = game_id
+        self.conns = conns
+        self.first_ids = [conn.interface.cmd_id - conn.interface.heartbeats for conn in conns]
+        self.started = self.last = started if started is not None else time.perf_counter()
+        self.phases = {}
+
+    def lap(self, phase: str):
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self.last
+        self.last = now
+
+    def report(self, **fields) -> dict:
+        return {
+            "game_id": self.game_id,
+            "wall_seconds": round(time.perf_counter() - self.started, 4),
+            "phases": {phase: round(secs, 4) for phase, secs in self.phases.items()},
+            "requests": [conn.interface.cmd_id - conn.interface.heartbeats - first
+                         for conn, first in zip(self.conns, self.first_ids)],
+            **fields,
+        }
+
+class PersistenceQueue:
+    """
+    Runs end-of-game writes on a single background thread, in the order
+    they were submitted, so the next game can be set up while they finish.
+    """
+
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, func, *args):
+        self.jobs.put((func, args))
+
+    def flush(self):
+        self.jobs.join()
+
+    def close(self):
+        self.flush()
+        self.jobs.put(None)
+        self.worker.join()
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    return
+                func, args = job
+                func(*args)
+            except Exception as e:
+                print(f"Error in background persistence: {e}")
+            finally:
+                self.jobs.task_done()
+
+# --- History Collection ---
+
+def history_points(data) -> list:
+    """(name, time, value) for each named number in get-history-data output."""
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except ValueError:
+            return []
+    points = []
+    for entry in data or []:
+        if not isinstance(entry, list) or not entry or not isinstance(entry[0], (int, float)):
+            continue
+        t = float(entry[0])
+        for item in entry[1:]:
+            if not (isinstance(item, list) and len(item) > 1 and isinstance(item[0], str)):
+                continue
+            value = next((v for v in item[1:] if isinstance(v, (int, float)) and not isinstance(v, bool)), None)
+            if value is not None:
+                points.append((item[0].lower(), t, float(value)))
+    return points
+
+def downsample_history(points: list, index: dict, t0: float, t1: float) -> np.ndarray:
+    """Mean value per series and time bin, carried forward through empty bins (NaN before the first)."""
+    values = np.full((HISTORY_SERIES, HISTORY_BINS), np.nan, dtype=np.float32)
+    kept = [(index[name], t, v) for name, t, v in points if name in index]
+    if not kept:
+        return values
+    rows, times, vals = (np.asarray(column) for column in zip(*kept))
+    cols = np.clip(((times - t0) / max(t1 - t0, 1e-9) * HISTORY_BINS).astype(int), 0, HISTORY_BINS - 1)
+    sums = np.zeros(values.shape)
+    counts = np.zeros(values.shape)
+    np.add.at(sums, (rows, cols), vals)
+    np.add.at(counts, (rows, cols), 1)
+    filled = counts > 0
+    values[filled] = sums[filled] / counts[filled]
+    last = np.where(filled, np.arange(HISTORY_BINS), 0)
+    np.maximum.accumulate(last, axis=1, out=last)
+    return values[np.arange(HISTORY_SERIES)[:, None], last]
+
+def append_history(path: str, records: np.ndarray, meta: dict):
+    with open(path, "ab") as f:
+        records.tofile(f)
+    tmp_file = path + ".json.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_file, path + ".json")
+
+def load_history(path: str):
+    """Memory-mapped records of a run written by HistoryCollector, and their series names."""
+    with open(path + ".json", encoding="utf-8") as f:
+        meta = json.load(f)
+    return np.memmap(path, dtype=HISTORY_DTYPE, mode="r"), meta
+
+class HistoryCollector:
+    """
+    Records the given ACT-R histories (utility-history, retrieval-history, ...)
+    on one model during each game. At game end each history is fetched once,
+    reduced to a fixed-size record and appended to a per-run file, so memory
+    stays bounded however many games are played.
+    """
+
+    def __init__(self, conn: actr.actr, histories: list, path: str):
+        self.conn = conn
+        self.histories = histories
+        self.path = path
+        # Row of each series name, per history; names beyond HISTORY_SERIES are dropped.
+        self.series = {history: {} for history in histories}
+        self.t0 = 0.0
+
+    def start_game(self, model_time: float):
+        self.t0 = model_time
+        for history in self.histories:
+            self.conn.record_history(history)
+
+    def collect(self, game_id: int, model_time: float) -> np.ndarray:
+        records = np.zeros(len(self.histories), dtype=HISTORY_DTYPE)
+        for i, history in enumerate(self.histories):
+            # A model kept resident keeps earlier games' data; only this game's is used.
+            points = [p for p in history_points(self.conn.get_history_data(history)) if p[1] >= self.t0]
+            self.conn.stop_recording_history(history)
+            index = self.series[history]
+            for name, _, _ in points:
+                if name not in index and len(index) < HISTORY_SERIES:
+                    index[name] = len(index)
+            records[i] = (game_id, i, self.t0, model_time, downsample_history(points, index, self.t0, model_time))
+        return records
+
+    def meta(self) -> dict:
+        return {
+            "histories": self.histories,
+            "bins": HISTORY_BINS,
+            "series": {h: sorted(index, key=index.get) for h, index in self.series.items()},
+        }
+
 # --- Coordinate Helpers ---
 
 def board_to_screen_coords(file_idx: int, rank_idx: int, perspective: chess.Color):
@@ -106,6 +327,45 @@ def board_to_screen_coords(file_idx: int, rank_idx: int, perspective: chess.Colo
     y = START_Y + row * SQUARE_SIZE
     return x, y
 
+def model_loc_to_square(loc, perspective: chess.Color):
+    """
+    The model names screen cells, not squares: column a..h runs left to
+    right and row 1..8 top to bottom (see abs-xy-to-loc in base-model.lisp).
+    """
+    name = str(loc).strip("|").lower()
+    if len(name) != 2 or name[0] not in "abcdefgh" or name[1] not in "12345678":
+        return None
+    col = ord(name[0]) - ord("a")
+    row = int(name[1]) - 1
+    if perspective == chess.WHITE:
+        return chess.square(col, 7 - row)
+    return chess.square(7 - col, row)
+
+def square_to_model_loc(square: int, perspective: chess.Color) -> str:
+    file_idx = chess.square_file(square)
+    rank_idx = chess.square_rank(square)
+    if perspective == chess.WHITE:
+        col, row = file_idx, 7 - rank_idx
+    else:
+        col, row = 7 - file_idx, rank_idx
+    return f"{chr(ord('a') + col)}{row + 1}"
+
+def board_pic_specs(board: chess.Board, perspective: chess.Color, squares=None) -> list:
+    """[name, model location, color] for each occupied square, as pic chunk values."""
+    specs = []
+    for sq in (chess.SQUARES if squares is None else squares):
+        piece = board.piece_at(sq)
+        if piece is None:
+            continue
+        color = "white" if piece.color == chess.WHITE else "black"
+        specs.append([piece.symbol().lower(), square_to_model_loc(sq, perspective), color])
+    return specs
+
+def seed_board_pics(conn: actr.actr, board: chess.Board, perspective: chess.Color, squares=None):
+    specs = board_pic_specs(board, perspective, squares)
+    if specs:
+        conn.call_command("seed-chess-pics", specs)
+
 # --- UI Classes ---
 
 class PlayerView:
@@ -122,6 +382,8 @@ class PlayerView:
         self.you_clock_pos = None
         self.opp_clock_item = None
         self.opp_clock_pos = None
+        # Piece glyphs on screen, replaced on every redraw; the rest of the window stays.
+        self.piece_items = []
 
     def init_window(self, time_limit_secs: int, you_are_white: bool):
 
@@ -216,7 +478,9 @@ class PlayerView:
         self.opp_clock_pos = opp_pos
 
     def clear_pieces(self):
-        self.conn.clear_exp_window(self.window)
+        if self.piece_items:
+            self.conn.remove_items_from_exp_window(self.window, *self.piece_items)
+        self.piece_items = []
 
     def update_clock(self, my_time, opp_time):
         def fmt(t):
@@ -255,10 +519,30 @@ class ChessGameManual:
         self.selected_square = None
         self.legal_targets = set()
 
+        # Legal moves of the current position, built once per ply.
+        self._move_index = None
+        self._legal_move_set = None
+
+        # Game termination, recomputed once per ply in update_termination.
+        self.position_counts = {}
+        self.position_key = None
+        # Optional cross-game TranspositionCache of move scores, set by main().
+        self.position_cache = None
+        # What the model's cache lookups and stores mean: "mock" phase 3 scores,
+        # or "evaluator/<depth>" when --evaluator scores the moves.
+        self.score_source = "mock"
+        self.insufficient_material = False
+        self.termination = None
+        self.game_result = None
+        self.update_termination(material_changed=True)
+
         self.highlight_items_actr1 = []
         self.highlight_items_actr2 = []
         
         self.scores = {}
+        self.material = MaterialState(self.board)
+        # Material balance the score text currently on screen was drawn for.
+        self.drawn_material = None
 
         # PGN
         self.game_id = game_id
@@ -271,6 +555,8 @@ class ChessGameManual:
         self.pgn_node = self.pgn_game
 
         self.finished = False
+        # Push pic chunks for the squares a move changes (see --seed_dm).
+        self.seed_dm = False
 
 
     def setup_views(self):
@@ -305,16 +591,8 @@ class ChessGameManual:
 
     def redraw_pieces_for_view(self, view: PlayerView):
 
-        view.conn.clear_exp_window(view.window)
-        
-        my_time = self.timer[view.color]
-        opp_time = self.timer[not view.color]
-        
-        view.init_window(
-            time_limit_secs=int(my_time), 
-            you_are_white=(view.color == chess.WHITE),
-        )
-        view.update_clock(my_time, opp_time)
+        view.clear_pieces()
+        view.update_clock(self.timer[view.color], self.timer[not view.color])
 
         for rank_idx in range(8):
             for file_idx in range(8):
@@ -326,14 +604,14 @@ class ChessGameManual:
                 ch = get_unicode(symbol)
                 x, y = board_to_screen_coords(file_idx, rank_idx, view.perspective)
                 c = 'black' if symbol == symbol.lower() else 'white'
-                view.conn.add_text_to_exp_window(
+                view.piece_items.append(view.conn.add_text_to_exp_window(
                     view.window,
                     ch,
                     x=x + 21,
                     y=y + 15,
                     font_size=30,
                     color= c,
-                )
+                ))
 
     def redraw_pieces_all(self):
         self.redraw_pieces_for_view(self.view_actr1)
@@ -341,9 +619,9 @@ class ChessGameManual:
         self.redraw_highlights()
         self.redraw_scores()
         
-        if self.board.is_game_over():
+        if self.game_result is not None:
             self.finished = True
-            result = self.board.result()
+            result = self.game_result
             self.pgn_game.headers["Result"] = result
             print(f"Game {self.game_id} finished with result {result}")
 
@@ -369,9 +647,13 @@ class ChessGameManual:
         self.scores = {}
 
     def redraw_scores(self):
+        balance = self.material.balance()
+        if balance == self.drawn_material:
+            return
         self.clear_scores()
+        self.drawn_material = balance
         for turn in [chess.WHITE, chess.BLACK]:    
-            score_formatted = format_material_advantage(self.board, turn)
+            score_formatted = self.material.text(turn)
             if not score_formatted:
                 continue
             for v_idx, target_view in enumerate([self.view_actr1,self.view_actr2]):
@@ -441,6 +723,108 @@ class ChessGameManual:
                 self.highlight_items_actr2.append(item)
 
 
+    def move_index(self) -> dict:
+        """
+        from-square -> {to-square: move} for the side to move. Promotions
+        are indexed as queen promotions, matching what a click produces.
+        """
+        if self._move_index is None:
+            index = {}
+            moves = set()
+            for m in self.board.legal_moves:
+                moves.add(m)
+                if m.promotion is not None and m.promotion != chess.QUEEN:
+                    continue
+                index.setdefault(m.from_square, {})[m.to_square] = m
+            self._move_index = index
+            self._legal_move_set = moves
+        return self._move_index
+
+    def update_termination(self, material_changed: bool):
+        """
+        Same outcome as board.outcome() for the current position, but
+        repetition is tracked with a Zobrist-hash counter and insufficient
+        material is only re-checked after a capture or promotion.
+        """
+        key = position_key(self.board)
+        self.position_key = key
+        repetitions = self.position_counts.get(key, 0) + 1
+        self.position_counts[key] = repetitions
+        if material_changed:
+            self.insufficient_material = self.board.is_insufficient_material()
+
+        has_moves = bool(self.move_index())
+        if not has_moves and self.board.is_check():
+            self.termination = chess.Termination.CHECKMATE
+            self.game_result = "0-1" if self.board.turn == chess.WHITE else "1-0"
+            return
+        if self.insufficient_material:
+            self.termination = chess.Termination.INSUFFICIENT_MATERIAL
+        elif not has_moves:
+            self.termination = chess.Termination.STALEMATE
+        elif self.board.halfmove_clock >= 150:
+            self.termination = chess.Termination.SEVENTYFIVE_MOVES
+        elif repetitions >= 5:
+            self.termination = chess.Termination.FIVEFOLD_REPETITION
+        else:
+            self.termination = None
+        self.game_result = "1/2-1/2" if self.termination is not None else None
+
+    def is_legal(self, move: chess.Move) -> bool:
+        self.move_index()
+        return move in self._legal_move_set
+
+    def legal_destinations(self, side_label: str, loc) -> list:
+        """Model locations the piece at model location loc can move to."""
+        view = self.view_actr1 if side_label == "actr1" else self.view_actr2
+        if self.finished or view.color != self.board.turn:
+            return []
+        sq = model_loc_to_square(loc, view.perspective)
+        if sq is None:
+            return []
+        return [square_to_model_loc(t, view.perspective) for t in self.move_index().get(sq, {})]
+
+    def model_move(self, side_label: str, from_loc, to_loc):
+        """Legal move for side_label given in model locations, or None."""
+        view = self.view_actr1 if side_label == "actr1" else self.view_actr2
+        if self.finished or view.color != self.board.turn:
+            return None
+        from_sq = model_loc_to_square(from_loc, view.perspective)
+        to_sq = model_loc_to_square(to_loc, view.perspective)
+        return self.move_index().get(from_sq, {}).get(to_sq)
+
+    def evaluate_model_move(self, side_label: str, from_loc, to_loc, depth: int = 0) -> int:
+        """Exchange-aware score of a move given in model locations; 0 if it is not legal."""
+        move = self.model_move(side_label, from_loc, to_loc)
+        if move is None:
+            return 0
+        key = self.cache_key(f"evaluator/{depth}")
+        if self.position_cache is not None:
+            score = self.position_cache.get(key, move)
+            if score is not None:
+                return score
+        score = evaluate_move(self.board, move, depth)
+        if self.position_cache is not None:
+            self.position_cache.put(key, move, score)
+        return score
+
+    def cache_key(self, source: str) -> int:
+        """Position cache key of the current position for scores from source."""
+        return self.position_key ^ source_salt(source)
+
+    def cached_move_score(self, side_label: str, from_loc, to_loc):
+        move = self.model_move(side_label, from_loc, to_loc)
+        if move is None or self.position_cache is None:
+            return None
+        return self.position_cache.get(self.cache_key(self.score_source), move)
+
+    def store_move_score(self, side_label: str, from_loc, to_loc, score) -> bool:
+        move = self.model_move(side_label, from_loc, to_loc)
+        if move is None or self.position_cache is None:
+            return False
+        self.position_cache.put(self.cache_key(self.score_source), move, int(score))
+        return True
+
     def on_square_click(self, side_label: str, square_name: str):
         if self.finished:
             return
@@ -462,12 +846,12 @@ class ChessGameManual:
             if piece is None or piece.color != side_color:
                 # print('clicked, not my piece')
                 pass
-            legal_moves = [m for m in self.board.legal_moves if m.from_square == sq]
-            if not legal_moves:
+            targets = self.move_index().get(sq)
+            if not targets:
                 # print('clicked, but no legal moves')
                 return
             self.selected_square = sq
-            self.legal_targets = {m.to_square for m in legal_moves}
+            self.legal_targets = set(targets)
             self.redraw_highlights()
             return
 
@@ -479,32 +863,22 @@ class ChessGameManual:
             return
 
         if piece is not None and piece.color == side_color and sq not in self.legal_targets:
-            legal_moves = [m for m in self.board.legal_moves if m.from_square == sq]
-            if not legal_moves:
+            targets = self.move_index().get(sq)
+            if not targets:
                 self.selected_square = None
                 self.legal_targets.clear()
                 self.redraw_highlights()
                 return
             self.selected_square = sq
-            self.legal_targets = {m.to_square for m in legal_moves}
+            self.legal_targets = set(targets)
             self.redraw_highlights()
             return
 
         if sq in self.legal_targets:
-            from_sq = self.selected_square
-            to_sq = sq
-            move = chess.Move(from_sq, to_sq)
-
-            # Promotion always queen
-            moving_piece = self.board.piece_at(from_sq)
-            if (
-                moving_piece is not None
-                and moving_piece.piece_type == chess.PAWN
-                and (chess.square_rank(to_sq) in (0, 7))
-            ):
-                move = chess.Move(from_sq, to_sq, promotion=chess.QUEEN)
-
-            if move in self.board.legal_moves:
+            # Promotion always queen (see move_index)
+            move = self.move_index().get(self.selected_square, {}).get(sq)
+
+            if move is not None and self.is_legal(move):
                 self.apply_move(move)
 
             self.selected_square = None
@@ -529,10 +903,27 @@ class ChessGameManual:
                 captured_piece = self.board.piece_at(move.to_square)
 
         delta = PIECE_VALUES.get(captured_piece)
+        self.material.update(mover, captured_piece, move.promotion)
+
+        # Every square the move changes; vacated ones simply yield no pic.
+        changed = [move.from_square, move.to_square]
+        if self.board.is_castling(move):
+            rank = chess.square_rank(move.to_square)
+            kingside = chess.square_file(move.to_square) == 6
+            changed += [chess.square(7 if kingside else 0, rank), chess.square(5 if kingside else 3, rank)]
+        elif self.board.is_en_passant(move):
+            changed.append(chess.square(chess.square_file(move.to_square), chess.square_rank(move.from_square)))
 
         self.board.push(move)
+        self._move_index = None
+        self._legal_move_set = None
+        self.update_termination(material_changed=captured_piece is not None or move.promotion is not None)
         self.pgn_node = self.pgn_node.add_variation(move)
         self.pgn_node.comment = f"[%clk {self.timer[not self.board.turn]:.1f}]"
+
+        if self.seed_dm:
+            for view in (self.view_actr1, self.view_actr2):
+                seed_board_pics(view.conn, self.board, view.perspective, changed)
         
         if delta and delta > 0:
             r = float(delta)
@@ -559,13 +950,69 @@ def register_actions_for_side(conn: actr.actr, side_label: str):
             action = f"{side_label}-sq-{sq_name}"
             conn.add_command(action, make_handler(side_label, sq_name))
 
-def initialize_model_state(conn: actr.actr, color_symbol: str, turn: bool):
+def register_move_oracle(conn: actr.actr, side_label: str):
+    def legal_destinations(loc):
+        if GAME is None:
+            return []
+        return GAME.legal_destinations(side_label, loc)
+
+    conn.add_command("chess-legal-destinations", legal_destinations,
+                     "Legal destinations of the piece at a model location. Params: loc")
+
+def register_move_evaluator(conn: actr.actr, side_label: str, depth: int = 0):
+    def evaluate(from_loc, to_loc):
+        if GAME is None:
+            return 0
+        return GAME.evaluate_model_move(side_label, from_loc, to_loc, depth)
+
+    conn.add_command("chess-evaluate-move", evaluate,
+                     "Static exchange score of a move between two model locations. Params: from to")
+
+def register_position_cache(conn: actr.actr, side_label: str):
+    def lookup(from_loc, to_loc):
+        if GAME is None:
+            return None
+        return GAME.cached_move_score(side_label, from_loc, to_loc)
+
+    def store(from_loc, to_loc, score):
+        if GAME is None:
+            return False
+        return GAME.store_move_score(side_label, from_loc, to_loc, score)
+
+    conn.add_command("chess-cache-lookup", lookup,
+                     "Cached score of a move in the current position, nil on a miss. Params: from to")
+    conn.add_command("chess-cache-store", store,
+                     "Store the score of a move in the current position. Params: from to score")
+
+def initialize_model_state(conn: actr.actr, color_symbol: str, turn: bool, seed_board: chess.Board = None):
     if color_symbol == 'white':
-        conn.goal_focus('init-white-goal')
+        focused = conn.goal_focus('init-white-goal')
     else:
-        conn.goal_focus('init-black-goal')
+        focused = conn.goal_focus('init-black-goal')
+
+    if seed_board is not None:
+        perspective = chess.WHITE if color_symbol == 'white' else chess.BLACK
+        seed_board_pics(conn, seed_board, perspective)
 
     print(f'init done for {color_symbol}')
+    return bool(focused)
+
+def wait_until(condition, description: str, timeout: float = READY_TIMEOUT) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            print(f"Timed out after {timeout:.1f}s waiting for {description}")
+            return False
+        time.sleep(READY_POLL_INTERVAL)
+    return True
+
+def model_ready(view: PlayerView) -> bool:
+    """
+    True once the view's window is open and installed as a vision device.
+    The goal itself is applied by ACT-R at the start of the next run, so
+    goal focus is confirmed by the return value of initialize_model_state.
+    """
+    return view.window is not None and bool(view.conn.call_command("current-devices", "vision"))
 
 def update_turn_signal(conn: actr.actr, is_my_turn: bool):
     turn_val = "t" if is_my_turn else "nil"
@@ -583,141 +1030,436 @@ def init_model(actr):
     actr.set_parameter_value(":visual-finst-span", 10.0)
     actr.set_parameter_value(":ignore-buffers", ["visual", "goal"])
     actr.start_hand_at_mouse()
+
+def reload_model(conn: actr.actr, model_path: str):
+    conn.call_command("reset")
+    conn.call_command("load-act-r-model", model_path)
+    init_model(conn)
+
+def resolve_model_path(spec: str) -> str:
+    """A game id in MODEL_DIR or a model file, as the absolute path ACT-R loads."""
+    path = os.path.join(MODEL_DIR, f"{spec}.lisp") if spec.isdigit() else spec
+    return os.path.abspath(path).replace("\\", "/")
+
+def connect(port: int, timeout: float = 0, heartbeat: float = 0, tap=None) -> actr.actr:
+    """
+    actr.start on port, retried with backoff until ACT-R answers. Requests
+    then fail after timeout seconds and a heartbeat checks the connection
+    every heartbeat seconds (0 disables either).
+    """
+    attempt = 0
+    while True:
+        try:
+            conn = actr.start(host="127.0.0.1", port=port, tap=tap)
+        except Exception as e:
+            print(f"Error connecting to ACT-R on port {port}: {e}")
+            conn = None
+        if conn is not None:
+            break
+        delay = RECONNECT_DELAYS[min(attempt, len(RECONNECT_DELAYS) - 1)]
+        print(f"Retrying ACT-R on port {port} in {delay}s")
+        time.sleep(delay)
+        attempt += 1
+    conn.interface.default_timeout = timeout or None
+    if heartbeat:
+        conn.interface.start_heartbeat(heartbeat, 3 * heartbeat)
+    return conn
+
+def reset_game_state(conn: actr.actr, window):
+    """
+    Warm continuation: drop only the per-game state (window/device, pending
+    events and buffer contents) and keep DM, utilities and parameters resident.
+    The clock keeps running: activations depend only on the age of each
+    reference, and the game loop times everything from the mp-time it starts at.
+    """
+    if window is not None:
+        conn.call_command("close-exp-window", window)
+    # With no goal the game productions cannot match, so requests still in flight
+    # (retrievals, motor actions) complete here instead of inside the next game.
+    conn.clear_buffer("goal")
+    drained = conn.call_command("drain-model-events", WARM_DRAIN_SECONDS)
+    if drained:
+        print(f"Warm reset: ran {drained}s of pending events")
+    for buffer in GAME_STATE_BUFFERS:
+        conn.clear_buffer(buffer)
+    init_model(conn)
     
 def main():
     global GAME
 
     parser = argparse.ArgumentParser(description='ACT-R Chess Self-Play')
     parser.add_argument('--continue_game', type=int, help='Game ID to continue from', default=0)
+    parser.add_argument('--oracle', action='store_true',
+                        help='Let the models ask python-chess for legal destinations instead of scanning for gray dots')
+    parser.add_argument('--evaluator', action='store_true',
+                        help='Score candidate moves with a python-chess exchange evaluator instead of the mock phase 3')
+    parser.add_argument('--eval_depth', type=int, default=0,
+                        help='Plies of capture search after the move (0: static exchange on the destination only)')
+    parser.add_argument('--position_cache', type=str, default=None,
+                        help='Memory-mapped file of move scores keyed by position, shared across games and processes')
+    parser.add_argument('--seed_dm', action='store_true',
+                        help='Push the board into DM as pic chunks at game start and after every move')
+    parser.add_argument('--record', type=str, default=None,
+                        help='Directory to write the socket sessions of both models to (see replay.py)')
+    parser.add_argument('--games', type=int, default=0,
+                        help='Stop after this many games (0: run until interrupted)')
+    parser.add_argument('--time_limit', type=int, default=600,
+                        help='Clock of each side in model seconds')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Set :seed on both models every game so runs are reproducible')
+    parser.add_argument('--save_dir', type=str, default=None,
+                        help='Directory for models, PGN and logs instead of save/')
+    parser.add_argument('--bench_out', type=str, default=None,
+                        help='Write per-game timings, request counts and model time to this JSON file')
+    parser.add_argument('--profile_trace', action='store_true',
+                        help='Aggregate production firings and model time per family from the trace')
+    parser.add_argument('--history', nargs='+', default=None,
+                        help='ACT-R histories of actr1 to keep per game (e.g. utility-history retrieval-history)')
+    parser.add_argument('--opponents', nargs='+', default=None,
+                        help='Play actr1 against these snapshots (game ids or files) in turn instead of its copy')
+    parser.add_argument('--pool_ports', type=int, nargs='+', default=[2651],
+                        help='ACT-R servers kept warm for --opponents, one snapshot each')
+    parser.add_argument('--rpc_timeout', type=float, default=0,
+                        help='Seconds to wait for any ACT-R request before abandoning the game (default 0: wait forever)')
+    parser.add_argument('--heartbeat', type=float, default=0,
+                        help='Seconds between connection checks (default 0: off)')
+    parser.add_argument('--dump_state', action='store_true',
+                        help='After each save, dump actr1\'s DM and utilities to save/state/chess_actr_<id>.npz')
+    parser.add_argument('--warm', action='store_true',
+                        help='Keep actr1 resident between games and only reload the copy on actr2')
     args = parser.parse_args()
 
+    if args.save_dir:
+        set_save_dir(args.save_dir)
     ensure_directories()
 
-    actr1 = actr.start(host="127.0.0.1", port=2650)
-    actr2 = actr.start(host="127.0.0.1", port=2651)
+    taps = (None, None)
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+        taps = (recorder(os.path.join(args.record, "actr1.jsonl")),
+                recorder(os.path.join(args.record, "actr2.jsonl")))
+    actr1 = connect(2650, args.rpc_timeout, args.heartbeat, taps[0])
+    opponents = [resolve_model_path(spec) for spec in args.opponents] if args.opponents else []
+    pool = None
+    if opponents:
+        # actr2 is taken from the pool each game.
+        pool = ModelPool(args.pool_ports, prepare=init_model,
+                         connect=lambda port: connect(port, args.rpc_timeout, args.heartbeat))
+        actr2 = None
+    else:
+        actr2 = connect(2651, args.rpc_timeout, args.heartbeat, taps[1])
+
+    history = None
+    if args.history:
+        os.makedirs(HISTORY_DIR, exist_ok=True)
+        history_path = os.path.join(HISTORY_DIR, datetime.now().strftime("%Y%m%d_%H%M%S") + ".bin")
+        history = HistoryCollector(actr1, args.history, history_path)
+
+    profilers = []
+    if args.profile_trace:
+        profilers = [TraceProfiler("actr1"), TraceProfiler("actr2")]
+        profilers[0].attach(actr1)
+        for conn in ([slot.conn for slot in pool.slots] if pool else [actr2]):
+            profilers[1].attach(conn)
 
     start_game_id = args.continue_game
     if start_game_id == 0:
         start_game_id = get_next_game_id()
     
     current_game_id = start_game_id
+    persistence = PersistenceQueue()
+    position_cache = TranspositionCache(args.position_cache) if args.position_cache else None
+    # Set when actr1 still holds the state saved at the end of the previous game.
+    warm_model_path = None
+    # Model loaded for the first game, then the latest one saved in this run,
+    # for continuing after an abandoned game.
+    last_model_path = None
+    opponent_conn = None
+    ready_failures = 0
+    bench_results = {"args": vars(args), "games": []}
 
     try:
-        while True:
-            
-            print(f"\n=== Starting Game {current_game_id} ===")
-            
-            model_to_load = "base-model.lisp" 
-            
-            prev_model_path = os.path.join(MODEL_DIR, f"{current_game_id - 1}.lisp")
-            if current_game_id > 1 and os.path.exists(prev_model_path):
-                model_to_load = prev_model_path
+        while not (args.games and current_game_id - start_game_id >= args.games):
+            try:
+                print(f"\n=== Starting Game {current_game_id} ===")
+                game_started = time.perf_counter()
+                if pool is not None:
+                    opponent = opponents[(current_game_id - start_game_id) % len(opponents)]
+                    print(f"Opponent: {opponent}")
+                    actr2 = opponent_conn = pool.acquire(opponent)
+                profile = GameProfile(current_game_id, (actr1, actr2), started=game_started)
+                for profiler in profilers:
+                    profiler.start_game(current_game_id)
             
-            if current_game_id == start_game_id and args.continue_game > 0:
-                 arg_model_path = os.path.join(MODEL_DIR, f"{args.continue_game}.lisp")
-                 if os.path.exists(arg_model_path):
-                     model_to_load = arg_model_path
+                model_to_load = "base-model.lisp" 
             
-            full_model_path = os.path.join(ROOT_DIR, model_to_load).replace("\\", "/")
-            print(f"Loading model from: {full_model_path}")
+                prev_model_path = os.path.join(MODEL_DIR, f"{current_game_id - 1}.lisp")
+                if pool is not None and last_model_path is not None:
+                    # Evaluation against --opponents: every game uses the generation loaded first.
+                    model_to_load = last_model_path
+                elif current_game_id > 1 and os.path.exists(prev_model_path):
+                    model_to_load = prev_model_path
+                elif last_model_path is not None:
+                    # The previous game was abandoned; go on from the last model saved (or the first one loaded).
+                    model_to_load = last_model_path
             
-            actr1.call_command("reset")
-            actr2.call_command("reset")
+                if current_game_id == start_game_id and args.continue_game > 0:
+                     arg_model_path = os.path.join(MODEL_DIR, f"{args.continue_game}.lisp")
+                     if os.path.exists(arg_model_path):
+                         model_to_load = arg_model_path
+                if last_model_path is None:
+                    last_model_path = model_to_load
             
-            actr1.call_command("load-act-r-model", full_model_path)
-            actr2.call_command("load-act-r-model", full_model_path)
-            init_model(actr1)
-            init_model(actr2)    
-            GAME = ChessGameManual(actr1, actr2, game_id=current_game_id, time_limit_secs=600)
-            register_actions_for_side(actr1, "actr1")
-            register_actions_for_side(actr2, "actr2")
+                full_model_path = os.path.join(ROOT_DIR, model_to_load).replace("\\", "/")
+
+                if pool is not None:
+                    if warm_model_path is not None:
+                        reset_game_state(actr1, GAME.view_actr1.window)
+                    else:
+                        print(f"Loading model from: {full_model_path}")
+                        reload_model(actr1, full_model_path)
+                elif warm_model_path is not None:
+                    # actr1 already holds the winner's state; only the copy is reloaded,
+                    # overlapping with the per-game reset of actr1.
+                    print(f"Warm continuation, reloading copy from: {warm_model_path}")
+                    loader = threading.Thread(target=reload_model, args=(actr2, warm_model_path))
+                    loader.start()
+                    reset_game_state(actr1, GAME.view_actr1.window)
+                    loader.join()
+                else:
+                    print(f"Loading model from: {full_model_path}")
+                
+                    actr1.call_command("reset")
+                    actr2.call_command("reset")
+                
+                    actr1.call_command("load-act-r-model", full_model_path)
+                    actr2.call_command("load-act-r-model", full_model_path)
+                    init_model(actr1)
+                    init_model(actr2)    
+                if args.seed is not None:
+                    game_index = current_game_id - start_game_id
+                    actr1.call_command("eval", f"(sgp :seed ({args.seed} {2 * game_index}))")
+                    actr2.call_command("eval", f"(sgp :seed ({args.seed} {2 * game_index + 1}))")
+                profile.lap("load")
+                GAME = ChessGameManual(actr1, actr2, game_id=current_game_id, time_limit_secs=args.time_limit)
+                if pool is not None:
+                    GAME.pgn_game.headers["Black"] = f"ACT-R 2 ({os.path.basename(opponent)})"
+                register_actions_for_side(actr1, "actr1")
+                register_actions_for_side(actr2, "actr2")
+                if args.oracle:
+                    for conn, side_label in ((actr1, "actr1"), (actr2, "actr2")):
+                        register_move_oracle(conn, side_label)
+                        conn.call_command("eval", "(setf *use-move-oracle* t)")
+                if position_cache is not None:
+                    GAME.position_cache = position_cache
+                    GAME.score_source = f"evaluator/{args.eval_depth}" if args.evaluator else "mock"
+                    for conn, side_label in ((actr1, "actr1"), (actr2, "actr2")):
+                        register_position_cache(conn, side_label)
+                        conn.call_command("eval", "(setf *use-position-cache* t)")
+                if args.evaluator:
+                    for conn, side_label in ((actr1, "actr1"), (actr2, "actr2")):
+                        register_move_evaluator(conn, side_label, args.eval_depth)
+                        conn.call_command("eval", "(setf *use-move-evaluator* t)")
             
-            GAME.setup_views() 
-
-            initialize_model_state(actr1, "white", True)
-            initialize_model_state(actr2, "black", False)
-
-            last_turn = chess.WHITE
-            last_second = int(actr1.call_command("mp-time"))
-            time.sleep(2)
-            print("Game Started.")
-            while not GAME.finished:
-                actr1.call_command("run", 0.1)
-                actr2.call_command("run", 0.1)
-                # time.sleep(0.1)
-
-                current_time_val = actr1.call_command("mp-time")
-                current_time = float(current_time_val) if current_time_val is not None else 0
+                GAME.setup_views() 
+
+                seed_board = GAME.board if args.seed_dm else None
+                GAME.seed_dm = args.seed_dm
+                white_focused = initialize_model_state(actr1, "white", True, seed_board)
+                black_focused = initialize_model_state(actr2, "black", False, seed_board)
+                if not (white_focused and black_focused):
+                    print("Warning: goal focus was not accepted by both models.")
+
+                last_turn = chess.WHITE
+                model_start = float(actr1.call_command("mp-time") or 0)
+                last_second = int(model_start)
+                current_time = model_start
+                if history is not None:
+                    history.start_game(model_start)
+                if not wait_until(lambda: model_ready(GAME.view_actr1) and model_ready(GAME.view_actr2),
+                                  "both models to be ready"):
+                    raise ModelNotReady(f"Game {current_game_id}: models not ready after {READY_TIMEOUT}s")
+                profile.lap("setup")
+                print("Game Started.")
+                while not GAME.finished:
+                    actr1.call_command("run", 0.1)
+                    actr2.call_command("run", 0.1)
+                    # time.sleep(0.1)
+
+                    current_time_val = actr1.call_command("mp-time")
+                    current_time = float(current_time_val) if current_time_val is not None else 0
                 
-                if int(current_time) > last_second:
-                    last_second = int(current_time)
-                    if GAME.board.turn == chess.WHITE:
-                        GAME.timer[chess.WHITE] -= 1
-                    else:
-                        GAME.timer[chess.BLACK] -= 1
-                    
-                    if GAME.timer[chess.WHITE] <= 0 or GAME.timer[chess.BLACK] <= 0:
-                        GAME.finished = True
-                        print("Time Over")
-                        if GAME.timer[chess.WHITE] <= 0:
-                            GAME.pgn_game.headers["Result"] = "0-1"
+                    if int(current_time) > last_second:
+                        last_second = int(current_time)
+                        if GAME.board.turn == chess.WHITE:
+                            GAME.timer[chess.WHITE] -= 1
                         else:
-                            GAME.pgn_game.headers["Result"] = "1-0"
+                            GAME.timer[chess.BLACK] -= 1
                     
-                    GAME.view_actr1.update_clock(GAME.timer[chess.WHITE], GAME.timer[chess.BLACK])
-                    GAME.view_actr2.update_clock(GAME.timer[chess.BLACK], GAME.timer[chess.WHITE])
-
-                if GAME.board.turn != last_turn:
-                    last_turn = GAME.board.turn
-                    is_white_turn = (GAME.board.turn == chess.WHITE)
-                    print('turn changed!!', ('white turn' if is_white_turn else 'black turn.'))
-                    update_turn_signal(actr1, is_white_turn)
-                    update_turn_signal(actr2, not is_white_turn)
-
-            print(f"Game {current_game_id} Ended. Result: {GAME.pgn_game.headers['Result']}")
-            
-            result = GAME.pgn_game.headers["Result"]
-            reward = -5 
-            if result == "1-0": 
-                reward = 100
-            elif result == "0-1": 
-                reward = -100
+                        if GAME.timer[chess.WHITE] <= 0 or GAME.timer[chess.BLACK] <= 0:
+                            GAME.finished = True
+                            print("Time Over")
+                            if GAME.timer[chess.WHITE] <= 0:
+                                GAME.pgn_game.headers["Result"] = "0-1"
+                            else:
+                                GAME.pgn_game.headers["Result"] = "1-0"
+                    
+                        GAME.view_actr1.update_clock(GAME.timer[chess.WHITE], GAME.timer[chess.BLACK])
+                        GAME.view_actr2.update_clock(GAME.timer[chess.BLACK], GAME.timer[chess.WHITE])
+
+                    if GAME.board.turn != last_turn:
+                        last_turn = GAME.board.turn
+                        is_white_turn = (GAME.board.turn == chess.WHITE)
+                        print('turn changed!!', ('white turn' if is_white_turn else 'black turn.'))
+                        update_turn_signal(actr1, is_white_turn)
+                        update_turn_signal(actr2, not is_white_turn)
+
+                profile.lap("play")
+                print(f"Game {current_game_id} Ended. Result: {GAME.pgn_game.headers['Result']}")
             
-            actr1.call_command("eval", "(mod-buffer-chunk 'goal '(action review))")
-            actr1.call_command("trigger-reward", reward / 100)
+                result = GAME.pgn_game.headers["Result"]
+                reward = -5 
+                if result == "1-0": 
+                    reward = 100
+                elif result == "0-1": 
+                    reward = -100
             
-            print("Reviewing (Compilation) for 10 seconds...")
-            actr1.call_command("run", 10)
-            time.sleep(3)
-
-            append_pgn_game(GAME.pgn_game, current_game_id)        
-            save_filename = f"{current_game_id}.lisp"
-            save_path = os.path.join(MODEL_DIR, save_filename)
+                # Games against --opponents evaluate the loaded generation: no reward,
+                # review or save, so every game is played by the same model.
+                evaluating = pool is not None
+                if not evaluating:
+                    actr1.call_command("eval", "(mod-buffer-chunk 'goal '(action review))")
+                    actr1.call_command("trigger-reward", reward / 100)
+
+                    print("Reviewing (Compilation) for 10 seconds...")
+                    actr1.call_command("run", 10)
+                profile.lap("review")
+
+                if history is not None:
+                    try:
+                        records = history.collect(current_game_id, float(actr1.call_command("mp-time") or 0))
+                        persistence.submit(append_history, history.path, records, history.meta())
+                    except Exception as e:
+                        print(f"Error collecting histories: {e}")
+
+                for profiler in profilers:
+                    rows = profiler.finish()
+                    print(f"Trace profile of {profiler.label}:")
+                    print(format_report(rows))
+                    persistence.submit(append_trace_csv, TRACE_FILE, rows)
+
+                persistence.submit(append_pgn_game, GAME.pgn_game, current_game_id)
+                if evaluating:
+                    save_filename = os.path.basename(model_to_load)
+                else:
+                    save_filename = f"{current_game_id}.lisp"
+                    save_path = os.path.join(MODEL_DIR, save_filename)
             
-            if os.path.exists(save_path):
-                timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-                save_filename = f"{current_game_id}_{timestamp_str}.lisp"
-                save_path = os.path.join(MODEL_DIR, save_filename)
+                    if os.path.exists(save_path):
+                        timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+                        save_filename = f"{current_game_id}_{timestamp_str}.lisp"
+                        save_path = os.path.join(MODEL_DIR, save_filename)
             
-            # abs path
-            save_path_lisp = save_path.replace("\\", "/")
+                    # abs path
+                    save_path_lisp = save_path.replace("\\", "/")
             
-            print(f"Saving model to: {save_path_lisp}")
-            try:
-                actr1.call_command("save-chess-model", save_path_lisp)
-                print(f"- Model saved to: {save_path_lisp}")
+                    # Synchronous even with --warm: the copy on actr2 is loaded from this file,
+                    # and consolidation rewrites actr1's DM, so nothing may touch actr1 meanwhile.
+                    # The other end-of-game writes go through the persistence queue.
+                    print(f"Saving model to: {save_path_lisp}")
+                    warm_model_path = None
+                    try:
+                        report = actr1.call_command("save-chess-model", save_path_lisp)
+                        print(f"- Model saved to: {save_path_lisp}")
+                        last_model_path = save_path
+                        if isinstance(report, list):
+                            for chunk_type, kept, merged, evicted in report:
+                                print(f"  DM {chunk_type}: kept {kept}, merged {merged}, evicted {evicted}")
+                        if args.warm:
+                            warm_model_path = save_path_lisp
                                 
          
-            except Exception as e:
-                print(f"Error calling save-model-file: {e}")
-
-            # log history
-            log_execution(current_game_id, save_filename, result)
+                    except Exception as e:
+                        print(f"Error calling save-model-file: {e}")
+
+                    # Structured DM / utility dump; only the query touches actr1.
+                    if args.dump_state:
+                        try:
+                            state = collect_actr_state(actr1)
+                            persistence.submit(write_actr_state, state, current_game_id, STATE_DIR)
+                        except Exception as e:
+                            print(f"Error collecting ACT-R state: {e}")
+
+                if position_cache is not None:
+                    print(f"Position cache: {position_cache.hits} hits, {position_cache.misses} misses")
+                    persistence.submit(position_cache.flush)
+
+                # log history
+                persistence.submit(log_execution, current_game_id, save_filename, result,
+                                   opponent if pool is not None else None)
+                if pool is not None:
+                    actr2.call_command("close-exp-window", GAME.view_actr2.window)
+                    pool.release(actr2)
+                    opponent_conn = None
+                    print(f"Pool: {pool.hits} hits, {pool.loads} loads")
+                profile.lap("save")
+
+                if args.bench_out:
+                    bench_results["games"].append(profile.report(
+                        result=result,
+                        moves=len(GAME.board.move_stack),
+                        model_seconds=round(current_time - model_start, 3),
+                    ))
+                    persistence.submit(write_benchmark, args.bench_out, dict(bench_results, games=list(bench_results["games"])))
             
-            current_game_id += 1
+                current_game_id += 1
+                ready_failures = 0
+            except ModelNotReady as e:
+                # The connections answer, so only the set-up is repeated, from a fresh load.
+                ready_failures += 1
+                for view in (GAME.view_actr1, GAME.view_actr2):
+                    if view.window is not None:
+                        view.conn.call_command("close-exp-window", view.window)
+                if opponent_conn is not None:
+                    pool.release(opponent_conn)
+                    opponent_conn = None
+                warm_model_path = None
+                if ready_failures < READY_RETRIES:
+                    print(f"{e}; setting the game up again")
+                else:
+                    print(f"{e}; skipping game {current_game_id} after {ready_failures} attempts")
+                    current_game_id += 1
+                    ready_failures = 0
+            except (actr.connection_lost, actr.request_timeout) as e:
+                # Abandon the stuck game, reconnect and go on with the next game id.
+                print(f"Game {current_game_id} abandoned: {e}")
+                actr1.interface.close()
+                actr1 = connect(2650, args.rpc_timeout, args.heartbeat)
+                if pool is not None:
+                    if opponent_conn is not None:
+                        pool.replace(opponent_conn)
+                        opponent_conn = None
+                else:
+                    actr2.interface.close()
+                    actr2 = connect(2651, args.rpc_timeout, args.heartbeat)
+                if profilers:
+                    profilers[0].attach(actr1)
+                    for conn in ([slot.conn for slot in pool.slots] if pool else [actr2]):
+                        if profilers[1].feed not in conn.interface.trace_listeners:
+                            profilers[1].attach(conn)
+                if history is not None:
+                    history.conn = actr1
+                warm_model_path = None
+                current_game_id += 1
+                ready_failures = 0
 
     except KeyboardInterrupt:
         print("\nExiting loop by user interrupt.")
+    finally:
+        print("Flushing pending writes...")
+        persistence.close()
+        if position_cache is not None:
+            position_cache.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
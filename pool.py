@@ -0,0 +1,104 @@
+# pool.py
+
+import threading
+import time
+import actr
+
+
+class PoolSlot:
+    def __init__(self, conn: actr.actr, port: int):
+        self.conn = conn
+        self.port = port
+        self.snapshot = None
+        self.last_used = 0.0
+        self.busy = False
+
+
+class ModelPool:
+    """
+    Connections to several ACT-R servers, each remembering which model file
+    it has loaded. acquire(path) hands out an idle instance that already
+    holds path, restored with a reset (which re-runs the loaded definition),
+    and only loads the file when no idle instance has it, into the idle
+    instance used least recently.
+    """
+
+    def __init__(self, ports: list, prepare=None, connect=None, host: str = "127.0.0.1"):
+        # prepare(conn) runs after every reset or load (parameters, hand position, ...).
+        self.prepare = prepare
+        self.connect = connect or (lambda port: actr.start(host=host, port=port))
+        self.slots = []
+        for port in ports:
+            conn = self.connect(port)
+            if conn is None:
+                print(f"Pool: no ACT-R on port {port}, skipped")
+                continue
+            self.slots.append(PoolSlot(conn, port))
+        if not self.slots:
+            raise RuntimeError("Pool: no ACT-R connection could be opened")
+        self.cv = threading.Condition()
+        self.hits = 0
+        self.loads = 0
+
+    def _choose(self, snapshot: str):
+        idle = [slot for slot in self.slots if not slot.busy]
+        if not idle:
+            return None
+        holding = [slot for slot in idle if slot.snapshot == snapshot]
+        if holding:
+            return holding[0]
+        # Empty instances first, then the least recently used snapshot is evicted.
+        return min(idle, key=lambda slot: (slot.snapshot is not None, slot.last_used))
+
+    def acquire(self, snapshot: str) -> actr.actr:
+        with self.cv:
+            slot = self._choose(snapshot)
+            while slot is None:
+                self.cv.wait()
+                slot = self._choose(snapshot)
+            slot.busy = True
+            hit = slot.snapshot == snapshot
+
+        conn = slot.conn
+        try:
+            conn.call_command("reset")
+            if hit:
+                self.hits += 1
+            else:
+                print(f"Pool: loading {snapshot} on port {slot.port}"
+                      + (f" (evicting {slot.snapshot})" if slot.snapshot else ""))
+                slot.snapshot = None
+                conn.call_command("load-act-r-model", snapshot)
+                slot.snapshot = snapshot
+                self.loads += 1
+            if self.prepare:
+                self.prepare(conn)
+        except (actr.connection_lost, actr.request_timeout):
+            self.replace(conn)
+            raise
+        except Exception:
+            self.release(conn)
+            raise
+        return conn
+
+    def release(self, conn: actr.actr):
+        with self.cv:
+            for slot in self.slots:
+                if slot.conn is conn:
+                    slot.busy = False
+                    slot.last_used = time.monotonic()
+            self.cv.notify()
+
+    def replace(self, conn: actr.actr) -> actr.actr:
+        """Reconnect the instance behind a failed connection; it holds no snapshot afterwards."""
+        for slot in self.slots:
+            if slot.conn is conn:
+                conn.interface.close()
+                slot.conn = self.connect(slot.port)
+                slot.snapshot = None
+                self.release(slot.conn)
+                return slot.conn
+        return None
+
+    def holdings(self) -> dict:
+        return {slot.port: slot.snapshot for slot in self.slots}
@@ -0,0 +1,224 @@
+# replay.py
+
+import argparse
+import json
+import queue
+import socket
+import threading
+import time
+
+EOT = b"\x04"
+
+# Connection checks sent by actr.interface.start_heartbeat. They depend on
+# wall time, not on the session, so they are neither recorded nor replayed.
+HEARTBEAT = ("check", ["act-r-running-p"])
+
+# How long the replay server waits for the client's next message before it
+# gives up on a session that has diverged from the recording.
+CLIENT_TIMEOUT = 30.0
+
+
+class RecordingSocket:
+    """
+    Socket wrapper for actr.start(..., tap=...). Every complete message in
+    either direction is appended to a JSON-lines session file as
+    {"t": seconds since connect, "dir": "out" | "in", "msg": {...}}.
+    Heartbeat checks and their answers are left out.
+    """
+
+    def __init__(self, sock: socket.socket, path: str):
+        self.sock = sock
+        self.path = path
+        self.log = open(path, "w", encoding="utf-8", buffering=1)
+        self.lock = threading.Lock()
+        self.partial = {"out": b"", "in": b""}
+        self.heartbeat_ids = set()
+        self.start = time.monotonic()
+
+    def _record(self, direction: str, data: bytes):
+        with self.lock:
+            buffer = self.partial[direction] + data
+            *messages, self.partial[direction] = buffer.split(EOT)
+            t = time.monotonic() - self.start
+            for message in messages:
+                msg = json.loads(message.decode("utf-8"))
+                if (msg.get("method"), msg.get("params")) == HEARTBEAT:
+                    self.heartbeat_ids.add(msg["id"])
+                    continue
+                if "method" not in msg and msg.get("id") in self.heartbeat_ids:
+                    self.heartbeat_ids.discard(msg["id"])
+                    continue
+                entry = {"t": round(t, 6), "dir": direction, "msg": msg}
+                self.log.write(json.dumps(entry) + "\n")
+
+    def sendall(self, data: bytes):
+        # Logged before sending so a reply can never be recorded ahead of its request.
+        self._record("out", data)
+        return self.sock.sendall(data)
+
+    def recv(self, size: int) -> bytes:
+        data = self.sock.recv(size)
+        if data:
+            self._record("in", data)
+        return data
+
+    def close(self):
+        with self.lock:
+            if not self.log.closed:
+                self.log.close()
+        return self.sock.close()
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
+
+
+def recorder(path: str):
+    """tap for actr.start that records the session to path."""
+    return lambda sock: RecordingSocket(sock, path)
+
+
+def load_session(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class ReplayServer:
+    """
+    Stands in for one ACT-R server by playing a recorded session back to a
+    live client over TCP. Client requests are matched to the recording in
+    order and the recorded results are returned under the client's own ids.
+    Commands that ACT-R called in Python are sent as recorded. Each server
+    message waits for its recorded delay times latency (0 for no delay).
+    Heartbeat checks are answered as they arrive, outside the recording.
+    """
+
+    def __init__(self, path: str, port: int, host: str = "127.0.0.1", latency: float = 1.0):
+        self.records = load_session(path)
+        self.path = path
+        self.latency = latency
+        self.listener = socket.create_server((host, port))
+        self.send_lock = threading.Lock()
+        self.sent = 0
+        self.matched = 0
+        self.mismatches = 0
+
+    def _read_client(self, conn: socket.socket, incoming: queue.Queue):
+        buffer = b""
+        while True:
+            try:
+                data = conn.recv(4096)
+            except OSError:
+                data = b""
+            if not data:
+                incoming.put(None)
+                return
+            buffer += data
+            *messages, buffer = buffer.split(EOT)
+            for message in messages:
+                msg = json.loads(message.decode("utf-8"))
+                if (msg.get("method"), msg.get("params")) == HEARTBEAT:
+                    self._send(conn, {"id": msg["id"], "result": [True], "error": None})
+                else:
+                    incoming.put(msg)
+
+    def _send(self, conn: socket.socket, msg: dict):
+        with self.send_lock:
+            conn.sendall(json.dumps(msg).encode("utf-8") + EOT)
+
+    def _next_client(self, incoming: queue.Queue, stashed: list, request: bool):
+        # Requests and replies from command threads may interleave differently
+        # than they did when recorded, so each kind is matched separately.
+        for i, message in enumerate(stashed):
+            if ("method" in message) == request:
+                return stashed.pop(i)
+        while True:
+            try:
+                message = incoming.get(timeout=CLIENT_TIMEOUT)
+            except queue.Empty:
+                return None
+            if message is None or ("method" in message) == request:
+                return message
+            stashed.append(message)
+
+    def serve_once(self) -> dict:
+        conn, _ = self.listener.accept()
+        incoming = queue.Queue()
+        reader = threading.Thread(target=self._read_client, args=(conn, incoming), daemon=True)
+        reader.start()
+
+        ids = {}
+        stashed = []
+        previous = 0.0
+        started = time.perf_counter()
+        completed = True
+        for record in self.records:
+            msg = record["msg"]
+            if record["dir"] == "out":
+                live = self._next_client(incoming, stashed, "method" in msg)
+                if live is None:
+                    completed = False
+                    break
+                if "method" in msg:
+                    ids[msg["id"]] = live["id"]
+                    if live["method"] == msg["method"] and live["params"][:1] == msg["params"][:1]:
+                        self.matched += 1
+                    else:
+                        self.mismatches += 1
+            else:
+                if self.latency:
+                    time.sleep(max(0.0, record["t"] - previous) * self.latency)
+                if "method" not in msg and msg.get("id") in ids:
+                    msg = dict(msg, id=ids.pop(msg["id"]))
+                self._send(conn, msg)
+                self.sent += 1
+            previous = record["t"]
+
+        # Keep the connection until the client closes it.
+        if completed:
+            reader.join()
+        conn.close()
+        return {
+            "session": self.path,
+            "completed": completed,
+            "seconds": round(time.perf_counter() - started, 3),
+            "sent": self.sent,
+            "matched": self.matched,
+            "mismatches": self.mismatches,
+        }
+
+    def close(self):
+        self.listener.close()
+
+
+def serve(paths: list, port: int, latency: float):
+    """One replay server per session file, on consecutive ports from port."""
+    servers = [ReplayServer(path, port + i, latency=latency) for i, path in enumerate(paths)]
+    results = [None] * len(servers)
+
+    def run(i):
+        results[i] = servers[i].serve_once()
+
+    threads = [threading.Thread(target=run, args=(i,), daemon=True) for i in range(len(servers))]
+    for i, thread in enumerate(threads):
+        print(f"Replaying {servers[i].path} on port {port + i}")
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for server in servers:
+        server.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded ACT-R sessions over TCP')
+    parser.add_argument('sessions', nargs='+', help='Session files written by experiment.py --record')
+    parser.add_argument('--port', type=int, default=2650, help='Port for the first session')
+    parser.add_argument('--zero_latency', action='store_true', help='Answer immediately instead of with the recorded delays')
+    args = parser.parse_args()
+
+    for result in serve(args.sessions, args.port, 0.0 if args.zero_latency else 1.0):
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+# snapshot.py
+#
+# Reads the model snapshots written by save-chess-model (save/model/*.lisp)
+# without ACT-R. The file is tokenized in blocks and only chunks, sdp and spp
+# settings and production names are kept, so memory follows the index, not
+# the file (which also carries productions and the embedded code strings).
+#
+#   python snapshot.py show save/model/12.lisp
+#   python snapshot.py diff 10 20
+#   python snapshot.py scan save/model --workers 4
+
+import argparse
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(ROOT_DIR, "save", "model")
+
+BLOCK_SIZE = 1 << 20
+
+TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment>;[^\n]*\n)
+  | (?P<block>\#\|.*?\|\#)
+  | (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<bar>\|[^|]*\|)
+  | (?P<open>\()
+  | (?P<close>\))
+  | (?P<quote>\#'|'|`|,@|,)
+  | (?P<atom>[^\s()"';|]+)
+""", re.VERBOSE | re.DOTALL)
+
+# Forms whose elements are indexed one at a time instead of being built whole.
+LIST_FORMS = {"add-dm", "define-chunks", "sdp", "spp"}
+CONTAINERS = {"define-model"}
+
+
+# Parentheses are yielded as these objects so a string "(" cannot pass for one.
+OPEN = object()
+CLOSE = object()
+
+
+class Symbol(str):
+    """A Lisp symbol, lowercased unless it was written with |bars|."""
+
+
+def _atom(text: str):
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return Symbol(text.lower())
+
+
+def tokens(path: str):
+    """Yield OPEN, CLOSE, strings, numbers and Symbols, reading the file in blocks."""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        buffer = ""
+        eof = False
+        while not eof:
+            block = f.read(BLOCK_SIZE)
+            eof = not block
+            buffer += block if block else "\n"
+            pos = 0
+            while pos < len(buffer):
+                match = TOKEN.match(buffer, pos)
+                # A token running into the end of the block may continue in the next one.
+                if match is None or (match.end() == len(buffer) and not eof):
+                    break
+                kind = match.lastgroup
+                if kind == "open":
+                    yield OPEN
+                elif kind == "close":
+                    yield CLOSE
+                elif kind == "string":
+                    yield match.group()[1:-1]
+                elif kind == "bar":
+                    yield Symbol(match.group()[1:-1])
+                elif kind == "atom":
+                    yield _atom(match.group())
+                pos = match.end()
+            if eof and pos < len(buffer):
+                raise ValueError(f"{path}: cannot read past offset {pos} of the last block")
+            buffer = buffer[pos:]
+
+
+def _head(form: list):
+    return form[0] if form and isinstance(form[0], str) else None
+
+
+def _params(items: list) -> dict:
+    return {str(k).lstrip(":"): v for k, v in zip(items[::2], items[1::2])}
+
+
+class ModelIndex:
+    """Chunks (name -> type and slots), sdp and spp parameters and production names of one snapshot."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.chunks = {}
+        self.sdp = {}
+        self.spp = {}
+        self.productions = []
+        self._read()
+
+    def _chunk(self, spec: list):
+        if not spec or not isinstance(spec[0], str):
+            return
+        name, rest = spec[0], spec[1:]
+        if rest and rest[0] == "isa":
+            rest = rest[1:]
+        chunk_type = None
+        if len(rest) % 2 == 1:
+            chunk_type, rest = rest[0], rest[1:]
+        self.chunks[name] = {"type": chunk_type, "slots": {str(k): v for k, v in zip(rest[::2], rest[1::2])}}
+
+    def _settings(self, table: dict, spec: list):
+        if spec and isinstance(spec[0], str):
+            table.setdefault(spec[0], {}).update(_params(spec[1:]))
+
+    def _element(self, head: str, item):
+        """One element of an add-dm / define-chunks / sdp / spp form."""
+        if not isinstance(item, list):
+            return False
+        if head in ("add-dm", "define-chunks"):
+            self._chunk(item)
+        elif head == "sdp":
+            self._settings(self.sdp, item)
+        else:
+            self._settings(self.spp, item)
+        return True
+
+    def _form(self, form: list):
+        """A completed top-level form (or one directly inside define-model)."""
+        head = _head(form)
+        if head in ("p", "p*") and len(form) > 1:
+            self.productions.append(form[1])
+        elif head == "sdp":
+            self._settings(self.sdp, form[1:])
+        elif head == "spp":
+            self._settings(self.spp, form[1:])
+
+    def _read(self):
+        stack = [[]]
+        for token in tokens(self.path):
+            if token is OPEN:
+                stack.append([])
+            elif token is CLOSE:
+                form = stack.pop()
+                parent = stack[-1]
+                parent_head = _head(parent)
+                # Nested style, (sdp (a :u 1) (b :u 2)): elements are consumed as they
+                # close, so the parent never grows past its head. In the flat style,
+                # (sdp a :reference-list (1.5 2.3)), a list is only a value.
+                if parent_head in LIST_FORMS and len(parent) == 1 and self._element(parent_head, form):
+                    continue
+                if len(stack) == 1 or parent_head in CONTAINERS:
+                    if _head(form) not in CONTAINERS:
+                        self._form(form)
+                    continue
+                parent.append(form)
+            else:
+                stack[-1].append(token)
+
+    def summary(self) -> dict:
+        types = {}
+        for chunk in self.chunks.values():
+            key = str(chunk["type"])
+            types[key] = types.get(key, 0) + 1
+        utilities = [p["u"] for p in self.spp.values() if isinstance(p.get("u"), (int, float))]
+        return {
+            "path": self.path,
+            "chunks": len(self.chunks),
+            "chunk_types": types,
+            "productions": len(self.productions),
+            "mean_utility": round(sum(utilities) / len(utilities), 4) if utilities else None,
+        }
+
+
+def diff(old: ModelIndex, new: ModelIndex) -> dict:
+    """Chunks added, removed or with changed slots (by name), and utility changes."""
+    old_names, new_names = set(old.chunks), set(new.chunks)
+    changed = sorted(n for n in old_names & new_names if old.chunks[n] != new.chunks[n])
+    utilities = {}
+    for name in set(old.spp) | set(new.spp):
+        before = old.spp.get(name, {}).get("u")
+        after = new.spp.get(name, {}).get("u")
+        if before != after:
+            utilities[name] = {"old": before, "new": after,
+                               "delta": round(after - before, 4) if None not in (before, after) else None}
+    return {
+        "old": old.path,
+        "new": new.path,
+        "added": sorted(new_names - old_names),
+        "removed": sorted(old_names - new_names),
+        "changed": changed,
+        "utilities": dict(sorted(utilities.items(), key=lambda kv: -abs(kv[1]["delta"] or 0))),
+        "productions_added": sorted(set(new.productions) - set(old.productions)),
+        "productions_removed": sorted(set(old.productions) - set(new.productions)),
+    }
+
+
+def format_diff(d: dict, top: int = 20) -> str:
+    lines = [f"{d['old']} -> {d['new']}",
+             f"  chunks: +{len(d['added'])} -{len(d['removed'])} ~{len(d['changed'])}"]
+    if d["productions_added"] or d["productions_removed"]:
+        lines.append(f"  productions: +{', '.join(d['productions_added'])} -{', '.join(d['productions_removed'])}")
+    lines.append(f"  utilities changed: {len(d['utilities'])}")
+    for name, u in list(d["utilities"].items())[:top]:
+        delta = f"{u['delta']:+.3f}" if u["delta"] is not None else "n/a"
+        lines.append(f"    {name:<40} {u['old']} -> {u['new']} ({delta})")
+    return "\n".join(lines)
+
+
+def generation(path: str) -> int:
+    """Game id at the start of a snapshot file name (12.lisp, 12_20240101_101010.lisp)."""
+    match = re.match(r"(\d+)", os.path.basename(path))
+    return int(match.group(1)) if match else -1
+
+
+def resolve(arg: str) -> str:
+    return os.path.join(MODEL_DIR, f"{arg}.lisp") if arg.isdigit() else arg
+
+
+def scan(directory: str, workers: int = None) -> list:
+    """Index every snapshot in directory in worker processes; summaries plus diffs of consecutive generations."""
+    paths = sorted((os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(".lisp")),
+                   key=lambda p: (generation(p), p))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        indexes = list(pool.map(ModelIndex, paths))
+    rows = []
+    for i, index in enumerate(indexes):
+        row = index.summary()
+        row["generation"] = generation(index.path)
+        if i:
+            d = diff(indexes[i - 1], index)
+            row.update(added=len(d["added"]), removed=len(d["removed"]), changed=len(d["changed"]),
+                       utilities_changed=len(d["utilities"]))
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect and compare saved model snapshots')
+    commands = parser.add_subparsers(dest='command', required=True)
+    show = commands.add_parser('show', help='Summary of one snapshot')
+    show.add_argument('snapshot', help='File, or game id in save/model')
+    compare = commands.add_parser('diff', help='Compare two snapshots')
+    compare.add_argument('old', help='File, or game id in save/model')
+    compare.add_argument('new', help='File, or game id in save/model')
+    compare.add_argument('--json', action='store_true', help='Print the full diff as JSON')
+    batch = commands.add_parser('scan', help='Summarize every snapshot in a directory')
+    batch.add_argument('directory', nargs='?', default=MODEL_DIR)
+    batch.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    if args.command == 'show':
+        print(json.dumps(ModelIndex(resolve(args.snapshot)).summary(), indent=4))
+    elif args.command == 'diff':
+        d = diff(ModelIndex(resolve(args.old)), ModelIndex(resolve(args.new)))
+        print(json.dumps(d, indent=4) if args.json else format_diff(d))
+    else:
+        for row in scan(args.directory, args.workers):
+            print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# tests/test_evaluation.py
+
+import os
+import sys
+
+import chess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils_chess import PIECE_VALUES, evaluate_move, static_exchange_eval
+
+
+def see(fen: str, uci: str) -> int:
+    return static_exchange_eval(chess.Board(fen), chess.Move.from_uci(uci))
+
+
+def test_undefended_capture_wins_the_piece():
+    assert see("4k3/8/8/3n4/4P3/8/8/4K3 w - - 0 1", "e4d5") == PIECE_VALUES[chess.KNIGHT]
+
+
+def test_defended_pawn_costs_the_queen():
+    assert see("4k3/8/2p5/3p4/8/8/8/3QK3 w - - 0 1", "d1d5") == PIECE_VALUES[chess.PAWN] - PIECE_VALUES[chess.QUEEN]
+
+
+def test_exchange_counts_every_recapture():
+    # NxN, pawn takes back, bishop takes the pawn: white ends a pawn up.
+    fen = "4k3/8/4p3/3n4/8/4N3/6B1/4K3 w - - 0 1"
+    assert see(fen, "e3d5") == PIECE_VALUES[chess.PAWN]
+
+
+def test_quiet_move_onto_attacked_square():
+    assert see("4k3/8/8/8/6p1/8/8/4K1N1 w - - 0 1", "g1f3") == -PIECE_VALUES[chess.KNIGHT]
+    assert see("4k3/8/8/8/8/8/8/4K1N1 w - - 0 1", "g1f3") == 0
+
+
+def test_promotion_counts_the_new_piece():
+    gain = PIECE_VALUES[chess.QUEEN] - PIECE_VALUES[chess.PAWN]
+    assert see("4k3/P7/8/8/8/8/8/4K3 w - - 0 1", "a7a8q") == gain
+
+
+def test_depth_searches_replies_elsewhere():
+    # The knight is safe on f3, but the bishop can take the undefended rook.
+    fen = "4k3/8/8/8/8/1b6/7K/3R2N1 w - - 0 1"
+    move = chess.Move.from_uci("g1f3")
+    assert evaluate_move(chess.Board(fen), move, 0) == 0
+    assert evaluate_move(chess.Board(fen), move, 1) == -PIECE_VALUES[chess.ROOK]
@@ -0,0 +1,67 @@
+# tests/test_interface.py
+
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import actr
+
+
+def serve(listener):
+    """Answer every request with its own params, except evaluate "stall", which is never answered."""
+    conn, _ = listener.accept()
+    buffer = b""
+    while True:
+        try:
+            data = conn.recv(4096)
+        except OSError:
+            return
+        if not data:
+            return
+        buffer += data
+        *messages, buffer = buffer.split(b"\x04")
+        for message in messages:
+            request = json.loads(message)
+            if request["params"][:1] == ["stall"]:
+                continue
+            reply = {"id": request["id"], "result": request["params"], "error": None}
+            conn.sendall(json.dumps(reply).encode("utf-8") + b"\x04")
+
+
+@pytest.fixture
+def iface():
+    listener = socket.create_server(("127.0.0.1", 0))
+    threading.Thread(target=serve, args=(listener,), daemon=True).start()
+    connection = actr.interface("127.0.0.1", listener.getsockname()[1])
+    assert connection.connected
+    yield connection
+    connection.close()
+    listener.close()
+
+
+def test_send_returns_result(iface):
+    assert iface.send("evaluate", "run", 1.5) == [True, "run", 1.5]
+
+
+def test_timeout_then_next_request(iface):
+    start = time.monotonic()
+    with pytest.raises(actr.request_timeout):
+        iface.send("evaluate", "stall", timeout=0.2)
+    assert time.monotonic() - start < 2
+    assert iface.actions == {}
+    assert iface.send("evaluate", "reset", timeout=2) == [True, "reset"]
+
+
+def test_close_cancels_pending_send(iface):
+    threading.Timer(0.2, iface.close, args=("test",)).start()
+    with pytest.raises(actr.connection_lost):
+        iface.send("evaluate", "stall")
+    with pytest.raises(actr.connection_lost):
+        iface.send("evaluate", "reset")
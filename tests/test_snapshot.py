@@ -0,0 +1,31 @@
+# tests/test_snapshot.py
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snapshot import ModelIndex
+
+MODEL = """
+(define-model chess
+  (add-dm (p1 isa pic n k l e1 c white) (m1 mv agent p1 dest e2))
+  (sdp (p1 :reference-count 3 :creation-time -10.0) (m1 :reference-count 1))
+  (sdp m1 :reference-list (1.5 2.3) :reference-count 2)
+  (spp (go :u 4.5) (stop :u 1))
+  (spp stop :u 2.5 :reward nil)
+  (p go =goal> state start ==> =goal> state next)
+  (p stop =goal> state next ==> -goal>))
+"""
+
+
+def test_nested_and_flat_settings(tmp_path):
+    path = tmp_path / "model.lisp"
+    path.write_text(MODEL)
+    index = ModelIndex(str(path))
+    assert index.chunks["p1"] == {"type": "pic", "slots": {"n": "k", "l": "e1", "c": "white"}}
+    assert index.chunks["m1"]["type"] == "mv"
+    assert index.sdp["p1"] == {"reference-count": 3, "creation-time": -10.0}
+    assert index.sdp["m1"] == {"reference-count": 2, "reference-list": [1.5, 2.3]}
+    assert index.spp == {"go": {"u": 4.5}, "stop": {"u": 2.5, "reward": "nil"}}
+    assert index.productions == ["go", "stop"]
@@ -0,0 +1,65 @@
+# tests/test_termination.py
+
+import os
+import random
+import sys
+
+import chess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from experiment import ChessGameManual
+
+
+class NullConn:
+    """Stands in for an ACT-R connection; every command is accepted and returns None."""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def game(fen: str = None) -> ChessGameManual:
+    g = ChessGameManual(NullConn(), NullConn(), game_id=0)
+    if fen is not None:
+        g.board = chess.Board(fen)
+        g.position_counts = {}
+        g._move_index = None
+        g.update_termination(material_changed=True)
+    return g
+
+
+def expected(board: chess.Board):
+    outcome = board.outcome()
+    return (outcome.termination, outcome.result()) if outcome else (None, None)
+
+
+def test_matches_board_outcome_over_random_games():
+    rng = random.Random(7)
+    for _ in range(40):
+        g = game()
+        while g.game_result is None:
+            g.apply_move(rng.choice(list(g.board.legal_moves)))
+            assert (g.termination, g.game_result) == expected(g.board)
+        assert g.termination is not None
+
+
+def test_fivefold_repetition():
+    g = game()
+    shuffle = [chess.Move.from_uci(u) for u in ("g1f3", "g8f6", "f3g1", "f6g8")]
+    for i in range(16):
+        g.apply_move(shuffle[i % 4])
+        assert (g.termination, g.game_result) == expected(g.board)
+    assert g.termination == chess.Termination.FIVEFOLD_REPETITION
+
+
+def test_final_positions():
+    cases = {
+        "7k/5Q2/6K1/8/8/8/8/8 b - - 0 1": chess.Termination.STALEMATE,
+        "7k/6Q1/6K1/8/8/8/8/8 b - - 0 1": chess.Termination.CHECKMATE,
+        "8/8/4k3/8/8/3BK3/8/8 w - - 0 1": chess.Termination.INSUFFICIENT_MATERIAL,
+        "8/8/4k3/8/8/3RK3/8/8 w - - 150 90": chess.Termination.SEVENTYFIVE_MOVES,
+    }
+    for fen, termination in cases.items():
+        g = game(fen)
+        assert g.termination == termination
+        assert (g.termination, g.game_result) == expected(g.board)
@@ -0,0 +1,60 @@
+# tests/test_transposition.py
+
+import os
+import sys
+
+import chess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transposition import WAYS, TranspositionCache, decode_move, position_key
+
+
+def test_get_put(tmp_path):
+    cache = TranspositionCache(str(tmp_path / "tt.bin"), buckets=64)
+    key = position_key(chess.Board())
+    move = chess.Move.from_uci("e2e4")
+    assert cache.get(key, move) is None
+    cache.put(key, move, -7)
+    assert cache.get(key, move) == -7
+    assert cache.get(key, chess.Move.from_uci("d2d4")) is None
+    assert cache.get(key ^ 1, move) is None
+    cache.put(key, move, 12)
+    assert cache.get(key, move) == 12
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_sources_do_not_share_records(tmp_path):
+    cache = TranspositionCache(str(tmp_path / "tt.bin"), buckets=64)
+    board = chess.Board()
+    move = chess.Move.from_uci("g1f3")
+    cache.put(position_key(board, "mock"), move, 1)
+    assert cache.get(position_key(board, "evaluator/2"), move) is None
+    assert cache.get(position_key(board, "mock"), move) == 1
+
+
+def test_full_bucket_evicts_oldest(tmp_path):
+    cache = TranspositionCache(str(tmp_path / "tt.bin"), buckets=1)
+    key = position_key(chess.Board())
+    moves = [chess.Move.from_uci(uci) for uci in ("a2a3", "b2b3", "c2c3", "d2d3", "e2e3")]
+    for score, move in enumerate(moves[:WAYS]):
+        cache.put(key, move, score)
+    # Make way 1 the least recently used record; the fifth move replaces it.
+    cache.table["stamp"][0] = [100, 50, 100, 100]
+    evicted = decode_move(int(cache.table["data"][0][1]) >> 32)
+    cache.put(key, moves[WAYS], 9)
+    assert cache.get(key, moves[WAYS]) == 9
+    assert cache.get(key, evicted) is None
+    for move in moves[:WAYS]:
+        assert (cache.get(key, move) is None) == (move == evicted)
+
+
+def test_reopen_keeps_records(tmp_path):
+    path = str(tmp_path / "tt.bin")
+    cache = TranspositionCache(path, buckets=8)
+    key = position_key(chess.Board())
+    cache.put(key, chess.Move.from_uci("e7e8q"), 900)
+    cache.close()
+    cache = TranspositionCache(path)
+    assert cache.buckets == 8
+    assert cache.get(key, chess.Move.from_uci("e7e8q")) == 900
@@ -0,0 +1,114 @@
+# trace_profile.py
+
+import csv
+import os
+import re
+import threading
+
+# "     1.235   PROCEDURAL             PRODUCTION-FIRED 2-5-RECALL-SCORE"
+TRACE_LINE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s+(\S+)\s+(\S+)\s*(.*?)\s*$")
+
+CSV_FIELDS = ["game_id", "model", "phase", "family", "firings", "model_seconds", "retrieval_failures"]
+
+
+def production_family(name: str) -> str:
+    """Leading number / single-letter components of a production name, e.g. 1-1-a-2-b-rel-target-check -> 1-1-a."""
+    parts = []
+    for part in name.lower().split("-")[:3]:
+        if not (part.isdigit() or len(part) == 1):
+            break
+        parts.append(part)
+    return "-".join(parts) or name.lower()
+
+
+class TraceProfiler:
+    """
+    Aggregates one model's trace as it streams through the echo monitor.
+    The model time from one production firing to the next is charged to the
+    family (and phase) of the production that fired; retrieval failures are
+    charged to the family that made the request.
+    """
+
+    def __init__(self, label: str):
+        self.label = label
+        self.lock = threading.Lock()
+        self.start_game(None)
+
+    def start_game(self, game_id):
+        with self.lock:
+            self.game_id = game_id
+            self.firings = {}
+            self.seconds = {}
+            self.failures = {}
+            self.current = None
+            self.since = None
+            self.last_time = None
+
+    def attach(self, conn):
+        conn.interface.trace_listeners.append(self.feed)
+
+    def _charge(self, now: float):
+        if self.current is not None and now >= self.since:
+            self.seconds[self.current] = self.seconds.get(self.current, 0.0) + now - self.since
+
+    def feed(self, text: str):
+        for line in text.splitlines():
+            match = TRACE_LINE.match(line)
+            if match is None:
+                continue
+            now = float(match.group(1))
+            event = match.group(3)
+            with self.lock:
+                self.last_time = now
+                if event == "PRODUCTION-FIRED":
+                    family = production_family(match.group(4))
+                    self._charge(now)
+                    self.firings[family] = self.firings.get(family, 0) + 1
+                    self.current = family
+                    self.since = now
+                elif event == "RETRIEVAL-FAILURE":
+                    family = self.current or "-"
+                    self.failures[family] = self.failures.get(family, 0) + 1
+
+    def finish(self) -> list:
+        """Close the open interval and return one row per family (see CSV_FIELDS)."""
+        with self.lock:
+            if self.last_time is not None:
+                self._charge(self.last_time)
+                self.since = self.last_time
+            families = sorted(set(self.firings) | set(self.failures))
+            return [{
+                "game_id": self.game_id,
+                "model": self.label,
+                "phase": family.split("-")[0],
+                "family": family,
+                "firings": self.firings.get(family, 0),
+                "model_seconds": round(self.seconds.get(family, 0.0), 3),
+                "retrieval_failures": self.failures.get(family, 0),
+            } for family in families]
+
+
+def format_report(rows: list, top: int = 8) -> str:
+    if not rows:
+        return "  (no productions traced)"
+    total = sum(r["model_seconds"] for r in rows) or 1.0
+    phases = {}
+    for r in rows:
+        phases[r["phase"]] = phases.get(r["phase"], 0.0) + r["model_seconds"]
+    lines = ["  phase dwell: " + ", ".join(f"{p}: {s:.1f}s ({100 * s / total:.0f}%)" for p, s in sorted(phases.items()))]
+    lines.append(f"  firings: {sum(r['firings'] for r in rows)}, retrieval failures: {sum(r['retrieval_failures'] for r in rows)}")
+    for r in sorted(rows, key=lambda r: r["model_seconds"], reverse=True)[:top]:
+        lines.append(f"  {r['family']:<8} {r['firings']:>6} fired {r['model_seconds']:>8.2f}s {r['retrieval_failures']:>5} failed")
+    return "\n".join(lines)
+
+
+def append_trace_csv(path: str, rows: list):
+    new_file = not os.path.exists(path)
+    try:
+        with open(path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            if new_file:
+                writer.writeheader()
+            writer.writerows(rows)
+    except Exception as e:
+        print(f"Error saving trace profile: {e}")
@@ -0,0 +1,101 @@
+# transposition.py
+
+import functools
+import hashlib
+import os
+import time
+import chess
+import chess.polyglot
+import numpy as np
+
+# One record per (position, move). check = key ^ data, so a record torn by a
+# concurrent writer in another process fails verification instead of
+# returning a wrong score.
+RECORD_DTYPE = np.dtype([
+    ("check", "<u8"),
+    ("data",  "<u8"),
+    ("stamp", "<u4"),
+    ("pad",   "<u4"),
+])
+
+WAYS = 4
+DEFAULT_BUCKETS = 1 << 16
+
+def encode_move(move: chess.Move) -> int:
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+def decode_move(code: int) -> chess.Move:
+    promotion = (code >> 12) & 0x7
+    return chess.Move(code & 0x3f, (code >> 6) & 0x3f, promotion=promotion or None)
+
+@functools.lru_cache(maxsize=None)
+def source_salt(source: str) -> int:
+    """64-bit value XORed into position keys so scores from different sources never share a record."""
+    if not source:
+        return 0
+    return int.from_bytes(hashlib.blake2b(source.encode("utf-8"), digest_size=8).digest(), "little")
+
+def position_key(board: chess.Board, source: str = "") -> int:
+    """Zobrist hash of the position, salted with the score source (e.g. "mock", "evaluator/2")."""
+    return chess.polyglot.zobrist_hash(board) ^ source_salt(source)
+
+
+class TranspositionCache:
+    """
+    Size-bounded position -> (move, score) cache backed by a memory-mapped
+    file, so several self-play processes can share what they have seen.
+    The table is WAYS-way set associative; a full bucket evicts its least
+    recently used record.
+    """
+
+    def __init__(self, path: str, buckets: int = DEFAULT_BUCKETS):
+        self.path = path
+        if os.path.exists(path):
+            records = os.path.getsize(path) // RECORD_DTYPE.itemsize
+            self.buckets = max(1, records // WAYS)
+            mode = "r+"
+        else:
+            self.buckets = buckets
+            mode = "w+"
+        self.table = np.memmap(path, dtype=RECORD_DTYPE, mode=mode, shape=(self.buckets, WAYS))
+        self.hits = 0
+        self.misses = 0
+
+    def _bucket(self, key: int, code: int):
+        return self.table[((key ^ (code * 0x9E3779B97F4A7C15)) & 0xFFFFFFFFFFFFFFFF) % self.buckets]
+
+    def get(self, key: int, move: chess.Move):
+        code = encode_move(move)
+        bucket = self._bucket(key, code)
+        for way in range(WAYS):
+            data = int(bucket["data"][way])
+            if int(bucket["check"][way]) ^ data == key and data >> 32 == code and data:
+                bucket["stamp"][way] = int(time.time())
+                self.hits += 1
+                score = data & 0xFFFFFFFF
+                return score - (1 << 32) if score & 0x80000000 else score
+        self.misses += 1
+        return None
+
+    def put(self, key: int, move: chess.Move, score: int):
+        code = encode_move(move)
+        data = (code << 32) | (int(score) & 0xFFFFFFFF)
+        bucket = self._bucket(key, code)
+        target = None
+        for way in range(WAYS):
+            old = int(bucket["data"][way])
+            if int(bucket["check"][way]) ^ old == key and old >> 32 == code:
+                target = way
+                break
+        if target is None:
+            target = int(np.argmin(bucket["stamp"]))
+        bucket["data"][target] = data
+        bucket["check"][target] = key ^ data
+        bucket["stamp"][target] = int(time.time())
+
+    def flush(self):
+        self.table.flush()
+
+    def close(self):
+        self.flush()
+        del self.table
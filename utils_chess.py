@@ -3,10 +3,24 @@
 import os
 import chess.pgn
 import chess
+import numpy as np
 
 PGN_FILE = "play_record.pgn"
 SAVE_DIR = "saved_models"
 
+# Chunk types exported by collect_actr_state, with the slots of each type as
+# declared in base-model.lisp.
+DM_CHUNK_SLOTS = {
+    "pic":   ("n", "l", "c"),
+    "mv":    ("agent", "dest"),
+    "rel":   ("r", "a", "ac", "ta", "tc"),
+    "score": ("m", "s"),
+    "tac":   ("rel1", "rel2", "v"),
+    "rlc":   ("d", "o", "front", "r", "l", "agent", "target"),
+}
+
+DM_CHUNK_PARAMS = ("activation", "base-level", "reference-count", "creation-time")
+
 PIECE_VALUES = {
     chess.PAWN:   1,
     chess.KNIGHT: 3,
@@ -62,20 +76,24 @@ def count_material(board: chess.Board) -> dict:
 
     return counts
 
+MATERIAL_ORDER = (chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN)
+
 def compute_material_advantage(
     board: chess.Board,
     perspective: chess.Color,
 ) -> tuple[list[tuple[int, int]], int]:
     counts = count_material(board)
+    return _material_advantage(counts, perspective)
+
+
+def _material_advantage(counts: dict, perspective: chess.Color) -> tuple[list[tuple[int, int]], int]:
     mine = counts[perspective]
     opp  = counts[not perspective]
 
     extra = []
     total_score = 0
 
-    order = [chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN]
-
-    for pt in order:
+    for pt in MATERIAL_ORDER:
         diff = mine[pt] - opp[pt]
 
         extra.append((pt, diff))
@@ -89,23 +107,129 @@ def format_material_advantage(
     perspective: chess.Color,
 ) -> str:
     extra, score = compute_material_advantage(board, perspective)
+    return _format_advantage(extra, score, perspective)
+
+
+def _format_advantage(extra: list, score: int, perspective: chess.Color) -> str:
     if not extra:
         return ""
 
     glyphs = UNICODE_WHITE if perspective == chess.BLACK else UNICODE_BLACK
 
-    order = [chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN]
-
     piece_str_parts = []
-    for pt in order:
-        # 해당 pt의 diff를 extra 리스트에서 찾기
-        diff = next((cnt for (ppt, cnt) in extra if ppt == pt), 0)
+    for pt, diff in extra:
         if diff > 0:
             piece_str_parts.append(glyphs[pt] * diff)
 
     pieces_str = "".join(piece_str_parts)
     return f"{pieces_str} + {score}" if score > 0 else pieces_str
 
+
+class MaterialState:
+    """
+    Piece counts per color kept up to date move by move, so the material
+    balance does not need a board scan on every redraw.
+    """
+
+    def __init__(self, board: chess.Board = None):
+        self.counts = count_material(board if board is not None else chess.Board())
+
+    def update(self, mover: chess.Color, captured: chess.Piece = None, promotion: int = None):
+        """
+        Apply one move. captured is the piece removed from the board
+        (including en passant), promotion the promoted piece type.
+        """
+        if captured is not None and captured.piece_type in PIECE_VALUES:
+            self.counts[captured.color][captured.piece_type] -= 1
+        if promotion is not None:
+            self.counts[mover][chess.PAWN] -= 1
+            if promotion in PIECE_VALUES:
+                self.counts[mover][promotion] += 1
+
+    def diff(self, perspective: chess.Color) -> list[tuple[int, int]]:
+        return _material_advantage(self.counts, perspective)[0]
+
+    def score(self, perspective: chess.Color) -> int:
+        return _material_advantage(self.counts, perspective)[1]
+
+    def balance(self) -> tuple:
+        """Hashable summary that changes whenever the material balance does."""
+        return tuple(d for _, d in self.diff(chess.WHITE))
+
+    def text(self, perspective: chess.Color) -> str:
+        extra, score = _material_advantage(self.counts, perspective)
+        return _format_advantage(extra, score, perspective)
+
+# Same scale as get-piece-score in base-model.lisp.
+KING_VALUE = 100
+
+def piece_value(piece_type: int) -> int:
+    return KING_VALUE if piece_type == chess.KING else PIECE_VALUES.get(piece_type, 0)
+
+def material_delta(board: chess.Board, move: chess.Move) -> int:
+    """Material gained by the mover: the captured piece plus any promotion gain."""
+    gain = 0
+    if board.is_en_passant(move):
+        gain += PIECE_VALUES[chess.PAWN]
+    else:
+        captured = board.piece_at(move.to_square)
+        if captured is not None:
+            gain += piece_value(captured.piece_type)
+    if move.promotion is not None:
+        gain += piece_value(move.promotion) - PIECE_VALUES[chess.PAWN]
+    return gain
+
+def _capture_moves(board: chess.Board, square: int = None):
+    for m in board.legal_moves:
+        if (square is None or m.to_square == square) and board.is_capture(m):
+            if m.promotion is None or m.promotion == chess.QUEEN:
+                yield m
+
+def _exchange_on(board: chess.Board, square: int) -> int:
+    """Best the side to move gains by recapturing on square with the least valuable attacker."""
+    captures = list(_capture_moves(board, square))
+    if not captures:
+        return 0
+    lva = min(captures, key=lambda m: piece_value(board.piece_type_at(m.from_square)))
+    gain = material_delta(board, lva)
+    board.push(lva)
+    gain -= _exchange_on(board, square)
+    board.pop()
+    return max(0, gain)
+
+def _capture_search(board: chess.Board, depth: int) -> int:
+    """Best capture-only line for the side to move, standing pat at 0."""
+    if depth <= 0:
+        return 0
+    best = 0
+    for m in _capture_moves(board):
+        gain = material_delta(board, m)
+        board.push(m)
+        gain -= _capture_search(board, depth - 1)
+        board.pop()
+        best = max(best, gain)
+    return best
+
+def static_exchange_eval(board: chess.Board, move: chess.Move) -> int:
+    """Material delta of move minus what the opponent wins back on the destination square."""
+    b = board.copy(stack=False)
+    gain = material_delta(b, move)
+    b.push(move)
+    return gain - _exchange_on(b, move.to_square)
+
+def evaluate_move(board: chess.Board, move: chess.Move, depth: int = 0) -> int:
+    """
+    Score of move for the side to move. With depth 0 this is the static
+    exchange evaluation; otherwise the opponent reply is a capture search
+    of that many plies over the whole board.
+    """
+    if depth <= 0:
+        return static_exchange_eval(board, move)
+    b = board.copy(stack=False)
+    gain = material_delta(b, move)
+    b.push(move)
+    return gain - _capture_search(b, depth)
+
 def both_sides_material_text(board: chess.Board):
     return {
         chess.WHITE: format_material_advantage(board, chess.WHITE),
@@ -145,13 +269,79 @@ def save_pgn_game(game):
         f.write("\n\n")   # 다음 게임과 구분
 
 
-def save_actr_state(game_id):
+# Every DM chunk as (chunk (slot value)...) over its filled slots, and the
+# matching sdp rows, in one round trip.  isa in a chunk-spec does not
+# restrict a match in ACT-R 7, so chunks are classified by their slots here.
+DM_QUERY = (
+    "(let ((chunks (no-output (sdm))))"
+    " (when chunks"
+    " (list (mapcar (lambda (c) (cons c (mapcar (lambda (s) (list s (chunk-slot-value-fct c s)))"
+    " (chunk-filled-slots-list c)))) chunks)"
+    f" (no-output (sdp-fct (list chunks {' '.join(':' + p for p in DM_CHUNK_PARAMS)}))))))"
+)
+
+def dm_chunk_kind(filled) -> str:
+    """
+    Type in DM_CHUNK_SLOTS with the fewest slots covering every filled slot,
+    or None (same rule as dm-chunk-kind in base-model.lisp).
+    """
+    filled = set(filled)
+    if not filled:
+        return None
+    best = None
+    for chunk_type, slots in DM_CHUNK_SLOTS.items():
+        if filled <= set(slots) and (best is None or len(slots) < len(DM_CHUNK_SLOTS[best])):
+            best = chunk_type
+    return best
+
+PRODUCTION_QUERY = (
+    "(mapcar (lambda (p) (list p (caar (no-output (spp-fct (list p :u))))))"
+    " (all-productions))"
+)
+
+def _as_float(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return np.nan
+
+def collect_actr_state(conn) -> dict:
+    """
+    Pull DM chunks of the types in DM_CHUNK_SLOTS (slot values plus
+    activation parameters) and production utilities from a connection.
+    Returns a flat dict of NumPy arrays keyed "<type>/<column>".
+    """
+    rows, params = conn.call_command("eval", DM_QUERY) or [[], []]
+    by_type = {chunk_type: [] for chunk_type in DM_CHUNK_SLOTS}
+    for row, param in zip(rows, params):
+        values = {str(slot).lower(): value for slot, value in row[1:]}
+        chunk_type = dm_chunk_kind(values)
+        if chunk_type is not None:
+            by_type[chunk_type].append((str(row[0]), values, param))
+
+    state = {}
+    for chunk_type, slots in DM_CHUNK_SLOTS.items():
+        chunks = by_type[chunk_type]
+        state[f"{chunk_type}/name"] = np.array([name for name, _, _ in chunks], dtype=str)
+        for slot in slots:
+            state[f"{chunk_type}/{slot}"] = np.array(
+                ["" if values.get(slot) is None else str(values[slot]) for _, values, _ in chunks], dtype=str)
+        for j, param in enumerate(DM_CHUNK_PARAMS):
+            state[f"{chunk_type}/{param.replace('-', '_')}"] = np.array(
+                [_as_float(p[j]) for _, _, p in chunks], dtype=np.float64)
+
+    productions = conn.call_command("eval", PRODUCTION_QUERY) or []
+    state["production/name"] = np.array([str(p[0]) for p in productions], dtype=str)
+    state["production/u"] = np.array([_as_float(p[1]) for p in productions], dtype=np.float64)
+    return state
+
+def write_actr_state(state: dict, game_id, save_dir=SAVE_DIR) -> str:
     """
-    나중에 ACT-R state 덤프할 때 쓸 자리. 지금은 빈 shell.
+    Write a collect_actr_state dump (DM pic, mv, rel, score, tac, rlc and
+    production utilities) as columnar arrays to <save_dir>/chess_actr_<game_id>.npz.
     """
-    ensure_dirs()
-    filename = os.path.join(SAVE_DIR, f"chess_actr_{game_id}.lisp")
-    with open(filename, "w") as f:
-        f.write(";; ACT-R state placeholder\n")
-        
-        
\ No newline at end of file
+    if not os.path.exists(save_dir):
+        os.makedirs(save_dir)
+    filename = os.path.join(save_dir, f"chess_actr_{game_id}.npz")
+    np.savez_compressed(filename, game_id=np.int64(game_id), **state)
+    return filename